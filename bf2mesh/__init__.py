@@ -0,0 +1,3 @@
+from .visiblemesh import VisibleMesh, scan, aload
+from .cache import DiskCache, MeshCache, open_mesh
+from .batch import load_many
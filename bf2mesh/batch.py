@@ -0,0 +1,91 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from .visiblemesh import VisibleMesh
+
+# windows frees named shared memory once its last handle closed, block of worker
+# gone before parent attaches, arrays pickled along with tables there instead
+SHARED_MEMORY = os.name == 'posix'
+
+def load_many(filenames, workers=None):
+    """
+    Parse meshes in process pool, results in same order as filenames
+    Vertex&index arrays passed back through shared memory instead of pickle
+    on POSIX systems only, other platforms pickle them, see SHARED_MEMORY
+
+    """
+    filenames = list(filenames)
+    if workers is None: workers = os.cpu_count() or 1
+    workers = min(workers, len(filenames))
+    if workers <= 1:
+        return [VisibleMesh(filename) for filename in filenames]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_load, filename, SHARED_MEMORY) for filename in filenames]
+        vmeshes = []
+        try:
+            for future in futures:
+                vmeshes.append(_attach(*future.result()))
+        finally:
+            # on failed parse blocks of meshes loaded by other workers released too
+            for future in futures[len(vmeshes):]:
+                if future.cancel() or future.exception() is not None: continue
+                _release(future.result()[1])
+    return vmeshes
+
+def _load(filename, shared=True):
+    # worker side, copy arrays to shared memory and pickle only tables
+    vmesh = VisibleMesh(filename)
+    if not shared: return vmesh, None, 0, 0
+    vertices = vmesh.vertices.array
+    index = vmesh.index.array
+
+    shm = _create(max(1, vertices.nbytes + index.nbytes))
+    try:
+        shm.buf[:vertices.nbytes] = memoryview(vertices).cast('B')
+        shm.buf[vertices.nbytes:vertices.nbytes + index.nbytes] = memoryview(index).cast('B')
+    finally:
+        shm.close()
+    logging.debug('loaded %s into shared memory %s', filename, shm.name)
+
+    vmesh.vertices = []
+    vmesh.index = []
+    return vmesh, shm.name, len(vertices), len(index)
+
+def _create(size):
+    # parent takes ownership and unlinks block, worker must not track it
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        # no track argument before python 3.13, block unregistered from posix tracker
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+def _attach(vmesh, name, vertnum, indexnum):
+    # parent side, copy arrays out of shared memory and release it
+    if name is None: return vmesh  # arrays pickled along with tables
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        vertices = np.frombuffer(shm.buf, '<f4', vertnum, 0).copy()
+        index = np.frombuffer(shm.buf, '<u2', indexnum, vertices.nbytes).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    vmesh._restore_arrays(vertices, index)
+    return vmesh
+
+def _release(name):
+    # parent side, unlink block of mesh never attached
+    if name is None: return
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return  # already unlinked by _attach
+    logging.debug('releasing shared memory %s', name)
+    shm.close()
+    shm.unlink()
@@ -28,6 +28,17 @@ class D3DDECLTYPE(enum.IntEnum):
             self.UNUSED : len([])
         }[self]
 
+    # numpy field format for structured vertex dtype
+    @property
+    def dtype(self):
+        return {
+            self.FLOAT1: ('<f4', (1,)),
+            self.FLOAT2: ('<f4', (2,)),
+            self.FLOAT3: ('<f4', (3,)),
+            self.FLOAT4: ('<f4', (4,)),
+            self.D3DCOLOR: ('u1', (4,)),
+        }[self]
+
 
 # copypasta from DX SDK 'Include/d3d9types.h' enum _D3DDECLUSAGE to
 # address vert attribute usage variable
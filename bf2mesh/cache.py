@@ -0,0 +1,320 @@
+import io
+import os
+import json
+import struct
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .codec import LONG
+from .visiblemesh import VisibleMesh
+from .visiblemesh import _bf2head, _bf2geom, _bf2lod, _bf2mat, _bf2rig, _bf2bone, _bf2vertattrib
+
+class DiskCache(object):
+    """
+    On-disk cache of parsed meshes, JSON record of tables plus raw vertex/index arrays
+    Entries keyed by source path, size and mtime, and carry source content hash
+    Total entries size kept under max_bytes, least recently used evicted first
+    Nothing unpickled, entries from shared cache directories load only data
+
+    """
+    # version of tables record, bump when fields added, renamed or removed
+    # entries of other versions ignored and reparsed
+    VERSION = 1
+    MAGIC = b'BF2MESHCACHE' + LONG.pack(VERSION)
+    SUFFIX = '.meshcache'
+
+    def __init__(self, path, max_bytes=1024**3):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def load(self, filename, verify=False):
+        """
+        Returns cached mesh, parsing and storing it on miss
+        verify=True rehashes source to catch edits that preserved size and mtime
+
+        """
+        stat = os.stat(filename)
+        entry = self.__entry(filename, stat)
+        vmesh = self.__read(entry, filename if verify else None)
+        if vmesh is not None:
+            logging.debug('loaded %s from cache %s', filename, entry)
+            vmesh.filename = filename
+            return vmesh
+
+        # hashed and parsed from same read, entry keyed by stat of bytes read
+        with open(filename, 'rb') as meshfile:
+            data = meshfile.read()
+            entry = self.__entry(filename, os.fstat(meshfile.fileno()))
+        logging.debug('caching %s as %s', filename, entry)
+        vmesh = VisibleMesh(filename, data=data)
+        self.__write(entry, hashlib.blake2b(data).digest(), vmesh)
+        self.evict()
+        return vmesh
+
+    def evict(self, max_bytes=None):
+        if max_bytes is None: max_bytes = self.max_bytes
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(self.SUFFIX): continue
+            entry = os.path.join(self.path, name)
+            try:
+                stat = os.stat(entry)
+            except FileNotFoundError:
+                continue  # evicted by another process
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+
+        total = sum([size for _, size, _ in entries])
+        for _, size, entry in sorted(entries):
+            if total <= max_bytes: break
+            logging.debug('evicting %s', entry)
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        self.evict(0)
+
+    def __entry(self, filename, stat):
+        key = '{}|{}|{}'.format(os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+        return os.path.join(self.path, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + self.SUFFIX)
+
+    def __digest(self, filename):
+        with open(filename, 'rb') as meshfile:
+            return hashlib.blake2b(meshfile.read()).digest()
+
+    def __read(self, entry, filename=None):
+        try:
+            with open(entry, 'rb') as entryfile:
+                data = entryfile.read()
+        except FileNotFoundError:
+            return None
+
+        header = len(self.MAGIC) + hashlib.blake2b().digest_size
+        if not data.startswith(self.MAGIC):
+            logging.warning('ignoring invalid cache entry %s', entry)
+            return None
+        if filename and data[len(self.MAGIC):header] != self.__digest(filename):
+            logging.debug('cache entry %s content hash mismatch', entry)
+            return None
+
+        try:
+            vmesh = self.__unpack(data, header)
+        except (ValueError, KeyError, TypeError, struct.error) as error:
+            # truncated or malformed entry, parsed again
+            logging.warning('removing broken cache entry %s: %s', entry, error)
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                pass
+            return None
+        # mark as recently used
+        os.utime(entry)
+        return vmesh
+
+    def __write(self, entry, digest, vmesh):
+        # write to temporary file first, entry appears atomically for other jobs
+        record = json.dumps(_record(vmesh)).encode()
+        temp = '{}.{}.tmp'.format(entry, os.getpid())
+        with open(temp, 'wb') as entryfile:
+            entryfile.write(self.MAGIC)
+            entryfile.write(digest)
+            entryfile.write(LONG.pack(len(record)))
+            entryfile.write(record)
+            np.save(entryfile, vmesh.vertices.array, allow_pickle=False)
+            np.save(entryfile, vmesh.index.array, allow_pickle=False)
+        os.replace(temp, entry)
+
+    def __unpack(self, data, offset):
+        lenght, = LONG.unpack_from(data, offset)
+        offset += LONG.size
+        record = json.loads(bytes(data[offset:offset + lenght]))
+        arrays = io.BytesIO(data)
+        arrays.seek(offset + lenght)
+        vertices = np.load(arrays, allow_pickle=False)
+        index = np.load(arrays, allow_pickle=False)
+        if arrays.tell() != len(data):
+            raise ValueError('%d bytes left after arrays' % (len(data) - arrays.tell()))
+        return _restore(record, vertices, index)
+
+
+def _record(vmesh):
+    # tables of mesh as JSON-compatible dict, strings as latin-1
+    def text(value):
+        return value.decode('latin-1')
+    def material_record(material):
+        return {
+            'alphamode': material.alphamode,
+            'fxfile': text(material.fxfile),
+            'technique': text(material.technique),
+            'maps': [text(texturename) for texturename in material.maps],
+            'vstart': material.vstart,
+            'istart': material.istart,
+            'inum': material.inum,
+            'vnum': material.vnum,
+            'u4': material.u4,
+            'u5': material.u5,
+            'mmin': material.mmin,
+            'mmax': material.mmax,
+            }
+    def lod_record(lod):
+        return {
+            'min': lod.min,
+            'max': lod.max,
+            'pivot': lod.pivot,
+            'rigs': [[(bone.id, bone.matrix) for bone in rig.bones] for rig in lod.rigs],
+            'nodenum': lod.nodenum,
+            'nodes': lod.nodes,
+            'materials': [material_record(material) for material in lod.materials],
+            }
+    return {
+        'isSkinnedMesh': vmesh.isSkinnedMesh,
+        'isBundledMesh': vmesh.isBundledMesh,
+        'isStaticMesh': vmesh.isStaticMesh,
+        'head': (vmesh.head.u1, vmesh.head.version, vmesh.head.u3, vmesh.head.u4, vmesh.head.u5),
+        'u1': vmesh.u1,
+        'geoms': [[lod_record(lod) for lod in geom.lods] for geom in vmesh.geoms],
+        'vertex_attributes': [(attrib.flag, attrib.offset, attrib.vartype, attrib.usage) for attrib in vmesh.vertex_attributes],
+        'vertblock': (vmesh.vertformat, vmesh.vertstride, vmesh.vertnum),
+        'vertices_offset': vmesh.vertices_offset,
+        'indexnum': vmesh.indexnum,
+        'index_offset': vmesh.index_offset,
+        'u2': vmesh.u2,
+        }
+
+def _restore(record, vertices, index):
+    # mesh of tables record and arrays, same types parser produces
+    def text(value):
+        return value.encode('latin-1')
+    def float3(value):
+        if value is not None: return tuple(value)
+    def matrix4(value):
+        return [tuple(row) for row in value]
+    def material_table(material_record):
+        material = _bf2mat()
+        material.alphamode = material_record['alphamode']
+        material.fxfile = text(material_record['fxfile'])
+        material.technique = text(material_record['technique'])
+        material.maps = [text(texturename) for texturename in material_record['maps']]
+        material.mapnum = len(material.maps)
+        for name in ('vstart', 'istart', 'inum', 'vnum', 'u4', 'u5'):
+            setattr(material, name, material_record[name])
+        material.mmin = float3(material_record['mmin'])
+        material.mmax = float3(material_record['mmax'])
+        return material
+    def lod_table(lod_record):
+        lod = _bf2lod()
+        lod.min = float3(lod_record['min'])
+        lod.max = float3(lod_record['max'])
+        lod.pivot = float3(lod_record['pivot'])
+        lod.rigs = []
+        for bones in lod_record['rigs']:
+            rig = _bf2rig()
+            for bone_id, bone_matrix in bones:
+                bone = _bf2bone()
+                bone.id, bone.matrix = bone_id, matrix4(bone_matrix)
+                rig.bones.append(bone)
+            rig.bonenum = len(rig.bones)
+            lod.rigs.append(rig)
+        lod.rignum = len(lod.rigs)
+        # bundledmesh nodes not read, only their number
+        lod.nodenum = lod_record['nodenum']
+        lod.nodes = [matrix4(node) for node in lod_record['nodes']]
+        lod.materials = [material_table(material) for material in lod_record['materials']]
+        lod.matnum = len(lod.materials)
+        return lod
+
+    vmesh = VisibleMesh(
+                isSkinnedMesh=record['isSkinnedMesh'],
+                isBundledMesh=record['isBundledMesh'],
+                isStaticMesh=record['isStaticMesh'])
+    vmesh.head = _bf2head()
+    vmesh.head.u1, vmesh.head.version, vmesh.head.u3, vmesh.head.u4, vmesh.head.u5 = record['head']
+    vmesh.u1 = record['u1']
+    vmesh.geoms = []
+    for lods in record['geoms']:
+        geom = _bf2geom()
+        geom.lods = [lod_table(lod) for lod in lods]
+        geom.lodnum = len(geom.lods)
+        vmesh.geoms.append(geom)
+    vmesh.geomnum = len(vmesh.geoms)
+    vmesh.vertex_attributes = [_bf2vertattrib(*attrib) for attrib in record['vertex_attributes']]
+    vmesh.vertattribnum = len(vmesh.vertex_attributes)
+    vmesh.vertformat, vmesh.vertstride, vmesh.vertnum = record['vertblock']
+    vmesh.vertices_offset = record['vertices_offset']
+    vmesh.indexnum = record['indexnum']
+    vmesh.index_offset = record['index_offset']
+    vmesh.u2 = record['u2']
+    if vertices.dtype != np.dtype('<f4') or index.dtype != np.dtype('<u2'):
+        raise ValueError('unexpected arrays of %s and %s' % (vertices.dtype, index.dtype))
+    vmesh._restore_arrays(vertices, index)
+    vmesh.isLoaded = True
+    return vmesh
+
+
+class MeshCache(object):
+    """
+    In-process cache of parsed meshes, hands out copy-on-write copies
+    Entries invalidated when source mtime or size changes
+    Vertex&index arrays size kept under max_bytes, least recently used evicted first
+
+    """
+    def __init__(self, max_bytes=512 * 1024**2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.__entries = OrderedDict()  # abspath -> (mtime_ns, size, nbytes, vmesh)
+        self.__lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def open(self, filename):
+        key = os.path.abspath(filename)
+        stat = os.stat(key)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self.__entries.move_to_end(key)
+                return entry[3].copy()
+
+        vmesh = VisibleMesh(filename)
+        nbytes = len(vmesh.vertices) * 4 + len(vmesh.index) * 2
+        with self.__lock:
+            self.__remove(key)
+            if nbytes <= self.max_bytes:
+                self.__entries[key] = (stat.st_mtime_ns, stat.st_size, nbytes, vmesh)
+                self.nbytes += nbytes
+                self.evict()
+        return vmesh.copy()
+
+    def evict(self, max_bytes=None):
+        if max_bytes is None: max_bytes = self.max_bytes
+        with self.__lock:
+            while self.__entries and self.nbytes > max_bytes:
+                key = next(iter(self.__entries))
+                logging.debug('evicting %s', key)
+                self.__remove(key)
+
+    def clear(self):
+        self.evict(0)
+
+    def __remove(self, key):
+        entry = self.__entries.pop(key, None)
+        if entry: self.nbytes -= entry[2]
+
+
+# process-wide cache used by open_mesh()
+mesh_cache = MeshCache()
+
+def open_mesh(filename):
+    """
+    Shared copy-on-write mesh from process-wide cache, file parsed only once
+
+    """
+    return mesh_cache.open(filename)
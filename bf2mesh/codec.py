@@ -0,0 +1,45 @@
+import struct
+from functools import lru_cache
+
+# mesh files are little-endian with standard sizes, long is always 4 bytes
+# precompiled records, avoiding formatting and compiling Struct on every call
+BYTE = struct.Struct('<b')
+SHORT = struct.Struct('<H')
+LONG = struct.Struct('<l')
+FLOAT = struct.Struct('<f')
+
+HEADER = struct.Struct('<5l')  # u1, version, u3, u4, u5
+VERTATTRIB = struct.Struct('<4H')  # flag, offset, vartype, usage
+VERTBLOCK = struct.Struct('<3l')  # vertformat, vertstride, vertnum
+MATERIAL = struct.Struct('<6l')  # vstart, istart, inum, vnum, u4, u5
+FLOAT3 = struct.Struct('<3f')  # bounds, pivot
+MATRIX4 = struct.Struct('<16f')  # nodes, bones
+
+_SINGLE = {'b': BYTE, 'H': SHORT, 'l': LONG, 'f': FLOAT}
+
+@lru_cache(maxsize=256)
+def array(fmt, lenght):
+    """
+    Cached Struct for lenght values of fmt, e.g. vertex or index block
+
+    """
+    if lenght == 1 and fmt in _SINGLE: return _SINGLE[fmt]
+    return struct.Struct('<{}{}'.format(lenght, fmt))
+
+def unpack_from(codec, buffer, offset=0, count=1):
+    """
+    Unpack count consecutive records starting at offset, returns list of records
+
+    """
+    view = memoryview(buffer)[offset:offset + codec.size * count]
+    return list(codec.iter_unpack(view))
+
+def pack_into(codec, buffer, offset, *records):
+    """
+    Pack consecutive records starting at offset, returns offset after last one
+
+    """
+    for record in records:
+        codec.pack_into(buffer, offset, *record)
+        offset += codec.size
+    return offset
@@ -1,105 +1,171 @@
-import struct 
+import struct
 import logging
 
-def read_int(fo, lenght=1):
-    fmt = '{}i'.format(lenght)
-    size = struct.calcsize(fmt)
+import numpy as np
+
+from . import codec
+
+class Buffer(object):
+    """
+    Cursor over in-memory mesh data, file-like enough for read_* functions
+    Values unpacked in place with unpack_from instead of per-field fo.read()
+
+    """
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+        self.closed = False
+
+    def __len__(self):
+        return len(self.data)
+
+    def tell(self):
+        return self.offset
+
+    def seek(self, offset, whence=0):
+        if whence == 1: offset += self.offset
+        elif whence == 2: offset += len(self.data)
+        self.offset = offset
+        return self.offset
+
+    def read(self, size=-1):
+        if size < 0: size = len(self.data) - self.offset
+        data = bytes(self.data[self.offset:self.offset + size])
+        self.offset += len(data)
+        return data
+
+    def unpack(self, st):
+        unpacked = st.unpack_from(self.data, self.offset)
+        self.offset += st.size
+        return unpacked
+
+    def write(self, data):
+        size = memoryview(data).nbytes
+        self.data[self.offset:self.offset + size] = data
+        self.offset += size
+        return size
+
+    def pack(self, st, *values):
+        st.pack_into(self.data, self.offset, *values)
+        self.offset += st.size
+
+    def close(self):
+        self.data = b''
+        self.closed = True
+
+def read_struct(fo, st):
+    if isinstance(fo, Buffer):
+        return fo.unpack(st)
+    return st.unpack(fo.read(st.size))
+
+def write_struct(fo, st, *values):
+    if isinstance(fo, Buffer):
+        fo.pack(st, *values)
+    else:
+        fo.write(st.pack(*values))
+
+def read_structs(fo, st, count):
+    # count consecutive records in single pass over buffer
+    if isinstance(fo, Buffer):
+        records = codec.unpack_from(st, fo.data, fo.tell(), count)
+        fo.seek(st.size * count, 1)
+        return records
+    return codec.unpack_from(st, fo.read(st.size * count), 0, count)
+
+def write_structs(fo, st, records):
+    if isinstance(fo, Buffer):
+        fo.seek(codec.pack_into(st, fo.data, fo.tell(), *records))
+    else:
+        data = bytearray(st.size * len(records))
+        codec.pack_into(st, data, 0, *records)
+        fo.write(data)
 
-    unpacked = struct.Struct(fmt).unpack(fo.read(size))
+def read_int(fo, lenght=1):
+    unpacked = read_struct(fo, codec.array('i', lenght))
     if lenght==1: return unpacked[0]
     return unpacked
 
 def read_float(fo, lenght=1):
-    fmt = '{}f'.format(lenght)
-    size = struct.calcsize(fmt)
-
-    unpacked = struct.Struct(fmt).unpack(fo.read(size))
+    unpacked = read_struct(fo, codec.array('f', lenght))
     if lenght==1: return unpacked[0]
     return unpacked
 
 def read_float3(fo):
-    fmt = '3f'
-    size = struct.calcsize(fmt)
-
-    return tuple(struct.Struct(fmt).unpack(fo.read(size)))
+    return read_struct(fo, codec.FLOAT3)
 
 def read_long(fo, lenght=1):
-    fmt = '{}l'.format(lenght)
-    size = struct.calcsize(fmt)
-
-    unpacked = struct.Struct(fmt).unpack(fo.read(size))
+    unpacked = read_struct(fo, codec.array('l', lenght))
     if lenght==1: return unpacked[0]
     return unpacked
 
 def read_short(fo, lenght=1):
-    fmt = '{}H'.format(lenght)
-    size = struct.calcsize(fmt)
-
-    unpacked = struct.Struct(fmt).unpack(fo.read(size))
+    unpacked = read_struct(fo, codec.array('H', lenght))
     if lenght==1: return unpacked[0]
     return unpacked
 
 def read_string(fo):
     lenght = read_long(fo)
-    fmt = '{}s'.format(lenght)
-    size = struct.calcsize(fmt)
 
-    unpacked = struct.Struct(fmt).unpack(fo.read(size))
+    unpacked = read_struct(fo, codec.array('s', lenght))
     return unpacked[0]
 
 def read_byte(fo, lenght=1):
-    fmt = '{}b'.format(lenght)
-    size = struct.calcsize(fmt)
-
-    unpacked = struct.Struct(fmt).unpack(fo.read(size))
+    unpacked = read_struct(fo, codec.array('b', lenght))
     if lenght==1: return unpacked[0]
     return unpacked
     
 def read_matrix4(fo):
-    fmt = '4f'
-    size = struct.calcsize(fmt)
-
-    unpacked = [
-        struct.Struct(fmt).unpack(fo.read(size)),
-        struct.Struct(fmt).unpack(fo.read(size)),
-        struct.Struct(fmt).unpack(fo.read(size)),
-        struct.Struct(fmt).unpack(fo.read(size))
-    ]
-    return unpacked
+    unpacked = read_struct(fo, codec.MATRIX4)
+    return [unpacked[row*4:row*4 + 4] for row in range(4)]
     
 
 def write_long(fo, value):
-    fmt = 'l'
-    fo.write(struct.Struct(fmt).pack(value))
+    write_struct(fo, codec.LONG, value)
 
 def write_short(fo, value):
-    fmt = 'H'
-    fo.write(struct.Struct(fmt).pack(value))
+    write_struct(fo, codec.SHORT, value)
 
 def write_float3(fo, v1, v2, v3):
-    fmt = '3f'
-    fo.write(struct.Struct(fmt).pack(v1, v2, v3))
+    write_struct(fo, codec.FLOAT3, v1, v2, v3)
 
 def write_byte(fo, value):
-    fmt = 'b'
-    fo.write(struct.Struct(fmt).pack(value))
+    write_struct(fo, codec.BYTE, value)
 
 def write_float(fo, value):
-    fmt = 'f'
     try:
-        fo.write(struct.Struct(fmt).pack(value))
+        write_struct(fo, codec.FLOAT, value)
     except struct.error as e:
-        logging.error('failed to write %s value as float' % value)
+        logging.error('failed to write %s value as float', value)
         raise e
 
 def write_matrix4(fo, value):
-    fmt = '4f'
-
-    for row in range(4):
-        fo.write(struct.Struct(fmt).pack(*value[row]))
+    write_struct(fo, codec.MATRIX4, *value[0], *value[1], *value[2], *value[3])
+
+def read_array(fo, dtype, lenght):
+    # whole block as writable numpy array, single copy out of buffer
+    if isinstance(fo, Buffer):
+        values = np.frombuffer(fo.data, dtype, lenght, fo.tell()).copy()
+        fo.seek(values.nbytes, 1)
+        return values
+    values = np.empty(lenght, dtype)
+    # short read leaves rest of block uninitialized, same error as read_struct gives
+    size = fo.readinto(values)
+    if size != values.nbytes:
+        raise struct.error('read_array requires %d bytes, got %d' % (values.nbytes, size or 0))
+    return values
+
+def read_float_array(fo, lenght):
+    return read_array(fo, '<f4', lenght)
+
+def read_short_array(fo, lenght):
+    return read_array(fo, '<u2', lenght)
+
+def write_array(fo, dtype, values):
+    # whole block as single contiguous write from buffer
+    values = np.ascontiguousarray(values, dtype)
+    fo.write(memoryview(values).cast('B'))
 
 def write_string(fo, value):
     lenght = len(value)
-    fmt = '{}s'.format(lenght)
-    fo.write(struct.Struct('l').pack(lenght))
-    fo.write(struct.Struct(fmt).pack(value))
\ No newline at end of file
+    write_struct(fo, codec.LONG, lenght)
+    write_struct(fo, codec.array('s', lenght), value)
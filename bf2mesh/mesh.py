@@ -14,6 +14,7 @@ class BF2Mesh(object):
             self.isStaticMesh = (file_extension == '.staticmesh')
             self.isCollisionMesh = (file_extension == '.collisionmesh')
         else:
+            self.filename = None
             self.isSkinnedMesh = isSkinnedMesh
             self.isBundledMesh = isBundledMesh
             self.isStaticMesh = isStaticMesh
@@ -0,0 +1,63 @@
+import os
+import json
+import time
+import functools
+from collections import defaultdict
+
+# disabled tracing costs one flag check per traced call
+# enable at runtime with trace.enable() or BF2MESH_TRACE=1 environment variable
+enabled = bool(os.environ.get('BF2MESH_TRACE'))
+
+timers = defaultdict(float)  # phase name -> seconds spent
+calls = defaultdict(int)  # phase name -> number of calls
+counters = defaultdict(int)  # counter name -> accumulated value
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    timers.clear()
+    calls.clear()
+    counters.clear()
+
+def count(name, value=1):
+    if enabled: counters[name] += value
+
+def timed(name):
+    """
+    Decorator accumulating wall time and calls of function under phase name
+
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled: return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timers[name] += time.perf_counter() - start
+                calls[name] += 1
+        return wrapper
+    return decorator
+
+def stats():
+    return {
+        'timers': dict(timers),
+        'calls': dict(calls),
+        'counters': dict(counters),
+        }
+
+def dump(fo=None):
+    """
+    Returns collected stats as JSON, writes them to fo if given
+
+    """
+    data = json.dumps(stats(), indent=4, sort_keys=True)
+    if fo: fo.write(data)
+    return data
@@ -1,21 +1,35 @@
 import os
+import copy
+import mmap
+import asyncio
 import logging
+import functools
 from math import sin, cos, radians
+from collections.abc import Sequence
 
+import numpy as np
+
+from . import trace
 from .mesh import BF2Mesh
 from .bf2types import D3DDECLTYPE, D3DDECLUSAGE, USED, UNUSED
-from .io import read_float
+from .codec import BYTE, LONG, FLOAT3, MATRIX4
+from .codec import HEADER, VERTATTRIB, VERTBLOCK, MATERIAL
+from .io import Buffer
+from .io import read_struct
+from .io import read_structs
+from .io import read_float_array
+from .io import read_short_array
 from .io import read_float3
 from .io import read_long
-from .io import read_short
 from .io import read_byte
 from .io import read_matrix4
 from .io import read_string
+from .io import write_struct
+from .io import write_structs
 from .io import write_long
-from .io import write_short
 from .io import write_float3
 from .io import write_byte
-from .io import write_float
+from .io import write_array
 from .io import write_matrix4
 from .io import write_string
 
@@ -25,12 +39,29 @@ class VisibleMesh(BF2Mesh):
             filename=None,
             isSkinnedMesh=False,
             isBundledMesh=False,
-            isStaticMesh=False):
+            isStaticMesh=False,
+            lazy=False,
+            scan=False,
+            deferred=False,
+            data=None):
         BF2Mesh.__init__(self, filename=filename,
                     isSkinnedMesh=isSkinnedMesh,
                     isBundledMesh=isBundledMesh,
                     isStaticMesh=isStaticMesh)
 
+        # lazy meshes map file into memory and keep vertex&index blocks
+        # as views into it, decoding them on first access
+        self.lazy = lazy
+        # scanned meshes read only tables, seeking over vertex&index blocks
+        # blocks being read from file on first access
+        self.scan = scan
+        # deferred meshes compose translate, rotate and transform calls into single matrix
+        # applied to vertices once, on next vertex data access or export
+        self.deferred = deferred
+        self.__transform = None  # pending 4x4 matrix of deferred transforms
+        self.__transform_rescan = False  # pending matrix has transforms not applied to bounds
+        self.__transform_refit = False  # pending matrix has rotations, bounds refit once applied
+
         ### MESH DATA ###
         self.head = _bf2head()  # header contains version info and some bfp4f data
         self.u1 = 0  # unknown byte, seems to be version flag for bfp4f
@@ -51,21 +82,46 @@ class VisibleMesh(BF2Mesh):
         # vertex data
         self.vertnum = 0  # number of vertices
         #self.vertices = tuple([_ for i in range( self.vertnum * self.vertstride / self.vertformat )])  # geom data, parse using attrib table
+        self.__dirty = []  # (start, stop) vertex ranges edited since load or last bounds update
         self.vertices = []
+        self.vertices_offset = None  # vertex block offset in file
+        self.__attributes = (None, {})  # cached per-attribute views, keyed by usage
 
         # indices
         # NOTE: indices are unsigned(?) short, therefor maximum indexed vertices per material is 32k
         self.indexnum = 0  # number of indices
         self.index = []  # indices array, values per-material
+        self.index_offset = None  # index block offset in file
 
         self.u2 = 0  # some another bfp4f garbage..
         ### MESH DATA ###
 
+        self.__meshfile = None
+        # bytes of mesh file parsed instead of reading filename, e.g. already hashed ones
+        self.__data = data
+        self.__mapped = None  # (path, stat) of file lazy blocks mapped from
+
         self.__enter__()
 
     def __enter__(self):
         if self.filename and not self.isLoaded:
-            self.__meshfile = open(file=self.filename, mode='rb')
+            # single read of whole file, parsing walks buffer with cursor
+            if self.__data is not None:
+                self.__meshfile = Buffer(self.__data)
+                self.__meshsize = len(self.__meshfile)
+                self.__data = None
+            elif self.scan:
+                self.__meshfile = open(file=self.filename, mode='rb')
+                self.__meshsize = os.fstat(self.__meshfile.fileno()).st_size
+            else:
+                with open(file=self.filename, mode='rb') as meshfile:
+                    if self.lazy:
+                        self.__meshfile = Buffer(mmap.mmap(meshfile.fileno(), 0, access=mmap.ACCESS_READ))
+                        # mapped blocks check file not rewritten under them before use
+                        self.__mapped = (os.path.abspath(self.filename), os.fstat(meshfile.fileno()))
+                    else:
+                        self.__meshfile = Buffer(meshfile.read())
+                self.__meshsize = len(self.__meshfile)
             self.__load()
             self.__meshfile.close()
         return self
@@ -75,6 +131,34 @@ class VisibleMesh(BF2Mesh):
             if not self.__meshfile.closed:
                 self.__meshfile.close()
     
+    def __getstate__(self):
+        # decode lazy blocks, drop file handles and cached views into vertices
+        self.__vertex_data()
+        self.__index_data()
+        state = self.__dict__.copy()
+        state['_VisibleMesh__meshfile'] = None
+        state['_VisibleMesh__attributes'] = (None, {})
+        return state
+
+    def copy(self):
+        """
+        Copy of mesh tables sharing vertex&index arrays until first edit
+        Shared arrays are read-only, editing methods copy them before writing
+
+        """
+        vertices, index = self.__vertex_data(), self.__index_data()
+        vertices.flags.writeable = False
+        index.flags.writeable = False
+        # memo makes deepcopy keep arrays as is
+        return copy.deepcopy(self, {id(vertices): vertices, id(index): index})
+
+    def __writable(self, vertices=True, index=True):
+        # copy-on-write for arrays shared by copy()
+        if vertices and not self.__vertex_data().flags.writeable:
+            self.__vertices = self.__vertices.copy()
+        if index and not self.__index_data().flags.writeable:
+            self.__index = self.__index.copy()
+
     def __str__(self):
         retstr = []
         retstr.append(self.filename)
@@ -84,10 +168,145 @@ class VisibleMesh(BF2Mesh):
         raise NotImplementedError
         #return '\n'.join(retstr)
     
+    @property
+    def vertices(self):
+        return _bf2sequence(self.__vertex_data())
+
+    @vertices.setter
+    def vertices(self, value):
+        # pending transforms were recorded for replaced vertices
+        self.__transform = None
+        self.__transform_rescan = False
+        self.__transform_refit = False
+        self.__mark_dirty()
+        if isinstance(value, _bf2block):
+            self.__vertices = value
+        elif isinstance(value, _bf2sequence):
+            self.__vertices = value.array.copy()
+        else:
+            self.__vertices = np.ascontiguousarray(value, dtype='<f4')
+
+    def _restore_arrays(self, vertices, index):
+        # arrays holding same data as loaded ones, e.g. read back from cache or passed between processes
+        # bounds stay valid, nothing left for rescan
+        self.vertices = vertices
+        self.index = index
+        self.__dirty = []
+
+    def __vertex_data(self):
+        if isinstance(self.__vertices, _bf2block):
+            logging.debug('decoding lazy vertex block of %s', self.filename)
+            self.__vertices = self.__vertices.decode()
+        if self.__transform is not None:
+            matrix, self.__transform = self.__transform, None
+            logging.debug('applying deferred transforms of %s', self.filename)
+            self.__transform_vertices(matrix, slice(0, None), rescan=self.__transform_rescan)
+            if self.__transform_refit: self.__fit_bounds(self.__material_table())
+            self.__transform_rescan = self.__transform_refit = False
+        return self.__vertices
+
+    @property
+    def vertex_dtype(self):
+        # structured dtype of single vertex, fields named by attribute usage
+        names, formats, offsets = [], [], []
+        for attrib in self.vertex_attributes:
+            if attrib.flag == UNUSED: continue
+            names.append(D3DDECLUSAGE(attrib.usage).name)
+            formats.append(D3DDECLTYPE(attrib.vartype).dtype)
+            offsets.append(attrib.offset)
+        return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self.vertstride})
+
+    @property
+    def vertex_array(self):
+        # (vertnum,) record array view into vertex block, writes update mesh
+        # positions could be edited through it, all bounds recomputed on next update
+        self.__writable(index=False)
+        self.__mark_dirty()
+        return self.__vertex_data().view(self.vertex_dtype).view(np.recarray)
+
+    def attribute(self, usage):
+        """
+        Zero-copy (vertnum, k) view of single vertex attribute, writes update mesh
+        Returns None if mesh has no such attribute, vertices shared by copy() copied first
+        Positions could be edited through view, all bounds recomputed on next update
+
+        """
+        if isinstance(usage, str): usage = D3DDECLUSAGE[usage]
+        self.__writable(index=False)
+        if usage == D3DDECLUSAGE.POSITION: self.__mark_dirty()
+        return self.__attribute(usage)
+
+    def __attribute(self, usage):
+        vertices = self.__vertex_data()
+        source, views = self.__attributes
+        if source is not vertices:
+            # vertices array replaced since last call, views point to old one
+            views = {}
+            self.__attributes = (vertices, views)
+        if usage not in views:
+            dtype = self.vertex_dtype
+            name = D3DDECLUSAGE(usage).name
+            if name in dtype.names:
+                views[usage] = vertices.view(dtype)[name]
+            else:
+                views[usage] = None
+        return views[usage]
+
+    def __mark_dirty(self, start=0, stop=None):
+        # vertices[start:stop] positions changed, whole buffer by default
+        if (start, stop) == (0, None):
+            self.__dirty = [(0, float('inf'))]
+        else:
+            self.__dirty.append(slice(start, stop).indices(self.vertnum)[:2])
+
+    @property
+    def index(self):
+        return _bf2sequence(self.__index_data())
+
+    @index.setter
+    def index(self, value):
+        if isinstance(value, _bf2block):
+            self.__index = value
+        elif isinstance(value, _bf2sequence):
+            self.__index = value.array.copy()
+        else:
+            self.__index = np.ascontiguousarray(value, dtype='<u2')
+
+    def __index_data(self):
+        if isinstance(self.__index, _bf2block):
+            logging.debug('decoding lazy index block of %s', self.filename)
+            self.__index = self.__index.decode()
+        return self.__index
+
+    @property
+    def material_indices(self):
+        # per-material views into index array, keyed by (geomId, lodId, materialId), writes update mesh
+        self.__writable(vertices=False)
+        index = self.__index_data()
+        return {(geomId, lodId, materialId): index[material.istart:material.istart + material.inum]
+                    for geomId, geom in enumerate(self.geoms)
+                    for lodId, lod in enumerate(geom.lods)
+                    for materialId, material in enumerate(lod.materials)}
+
+    @property
+    def vertex_block(self):
+        # raw little-endian bytes of not yet decoded lazy vertex block
+        if isinstance(self.__vertices, _bf2block) and self.__transform is None:
+            self.__vertices.check()
+            return self.__vertices.view
+
+    @property
+    def index_block(self):
+        # raw little-endian bytes of not yet decoded lazy index block
+        if isinstance(self.__index, _bf2block):
+            self.__index.check()
+            return self.__index.view
+
     @property
     def vertex_size(self):
         return sum([len(D3DDECLTYPE(v_attrib.vartype)) for v_attrib in self.vertex_attributes if v_attrib.flag is USED])
         
+    @trace.timed('load')
     def __load(self):
         self.__read_header()
         self.__read_u1()
@@ -95,9 +314,7 @@ class VisibleMesh(BF2Mesh):
         self.__read_geom_table()
         self.__read_vertattribnum()
         self.__read_vertattrib_table()
-        self.__read_vertformat()
-        self.__read_vertstride()
-        self.__read_vertnum()
+        self.__read_vertblock()
         self.__read_vertices()
         self.__read_indexnum()
         self.__read_indices()
@@ -106,144 +323,209 @@ class VisibleMesh(BF2Mesh):
         self.__load_lods_materials()
         
         # make sure we did read whole file, not missing any byte!
-        if self.__meshfile.tell() == os.stat(self.filename).st_size:
-            logging.debug('loaded %d bytes from %s' % (self.__meshfile.tell(), self.filename))
+        if self.__meshfile.tell() == self.__meshsize:
+            logging.debug('loaded %d bytes from %s', self.__meshfile.tell(), self.filename)
+            if self.scan:
+                # scanned meshes seek over vertex&index blocks
+                trace.count('bytes_read', self.__meshsize - self.__vertices.nbytes - self.__index.nbytes)
+            else:
+                trace.count('bytes_read', self.__meshsize)
             self.isLoaded = True
+            # bounds of loaded mesh taken as is
+            self.__dirty = []
         else:
             raise AttributeError('did not parsed all bytes from %s' % self.filename)
     
     def __read_header(self):
-        logging.debug('starting reading header at %d' % self.__meshfile.tell())
+        logging.debug('starting reading header at %d', self.__meshfile.tell())
         self.head.load(self.__meshfile)
-        logging.debug('finished reading header at %d' % self.__meshfile.tell())
+        logging.debug('finished reading header at %d', self.__meshfile.tell())
     
     def __read_u1(self):
         self.u1 = read_byte(self.__meshfile)
-        logging.debug('u1 = %d' % self.u1)
+        logging.debug('u1 = %d', self.u1)
     
     def __read_geomnum(self):
         self.geomnum = read_long(self.__meshfile)
-        logging.debug('geomnum = %d' % self.geomnum)
+        logging.debug('geomnum = %d', self.geomnum)
     
     def __read_geom_table(self):
-        logging.debug('starting reading geom table at %d' % self.__meshfile.tell())
+        logging.debug('starting reading geom table at %d', self.__meshfile.tell())
         self.geoms = [_bf2geom() for i in range(self.geomnum)]
         for geom in self.geoms:
             geom.load(self.__meshfile)
-        logging.debug('finished reading geom table at %d' % self.__meshfile.tell())
+        logging.debug('finished reading geom table at %d', self.__meshfile.tell())
 
     def __read_vertattribnum(self):
         self.vertattribnum = read_long(self.__meshfile)
-        logging.debug('vertattribnum = %d' % self.vertattribnum)
+        logging.debug('vertattribnum = %d', self.vertattribnum)
     
     def __read_vertattrib_table(self):
-        logging.debug('starting reading vertattrib table at %d' % self.__meshfile.tell())
-        self.vertex_attributes = [_bf2vertattrib() for i in range(self.vertattribnum)]
-        for i in range(self.vertattribnum):
-            self.vertex_attributes[i].load(self.__meshfile)
-            logging.debug('attrib [{0}] = {1.flag}, {1.offset}, {1.usage}, {1.vartype}'.format(i, self.vertex_attributes[i]))
-        logging.debug('finished reading vertattrib table at %d' % self.__meshfile.tell())
-
-    def __read_vertformat(self):
-        self.vertformat = read_long(self.__meshfile)
-        logging.debug('vertformat = %d' % self.vertformat)
-
-    def __read_vertstride(self):
-        self.vertstride = read_long(self.__meshfile)
-        logging.debug('vertstride = %d' % self.vertstride)
-
-    def __read_vertnum(self):
-        self.vertnum = read_long(self.__meshfile)
-        logging.debug('vertnum = %d' % self.vertnum)
+        logging.debug('starting reading vertattrib table at %d', self.__meshfile.tell())
+        # whole table unpacked at once
+        records = read_structs(self.__meshfile, VERTATTRIB, self.vertattribnum)
+        self.vertex_attributes = [_bf2vertattrib(*record) for record in records]
+        for i, attrib in enumerate(self.vertex_attributes):
+            logging.debug('attrib [%d] = %d, %d, %d, %d', i, attrib.flag, attrib.offset, attrib.usage, attrib.vartype)
+        logging.debug('finished reading vertattrib table at %d', self.__meshfile.tell())
+
+    def __read_vertblock(self):
+        self.vertformat, self.vertstride, self.vertnum = read_struct(self.__meshfile, VERTBLOCK)
+        logging.debug('vertformat = %d', self.vertformat)
+        logging.debug('vertstride = %d', self.vertstride)
+        logging.debug('vertnum = %d', self.vertnum)
 
     def __read_vertices(self):
-        logging.debug('starting reading vertex block at %d' % self.__meshfile.tell())
+        logging.debug('starting reading vertex block at %d', self.__meshfile.tell())
         data_num = int(self.vertstride / self.vertformat * self.vertnum)
-        self.vertices = read_float(self.__meshfile, data_num)
-        logging.debug('array size = %d' % len(self.vertices))
-        logging.debug('finished reading vertex block at %d' % self.__meshfile.tell())
+        self.vertices_offset = self.__meshfile.tell()
+        if self.lazy or self.scan:
+            self.vertices = _bf2block(self.__meshfile, read_float_array, data_num, 4, self.__mapped)
+        else:
+            self.vertices = read_float_array(self.__meshfile, data_num)
+        logging.debug('array size = %d', data_num)
+        logging.debug('finished reading vertex block at %d', self.__meshfile.tell())
     
     def __read_indexnum(self):
         self.indexnum = read_long(self.__meshfile)
         logging.debug('indexnum = %d', self.indexnum)
 
     def __read_indices(self):
-        logging.debug('starting reading index block at %d' % self.__meshfile.tell())
-        self.index = read_short(self.__meshfile, self.indexnum)
-        logging.debug('finished reading index block at %d' % self.__meshfile.tell())
+        logging.debug('starting reading index block at %d', self.__meshfile.tell())
+        self.index_offset = self.__meshfile.tell()
+        if self.lazy or self.scan:
+            self.index = _bf2block(self.__meshfile, read_short_array, self.indexnum, 2, self.__mapped)
+        else:
+            self.index = read_short_array(self.__meshfile, self.indexnum)
+        logging.debug('finished reading index block at %d', self.__meshfile.tell())
 
     def __read_u2(self):
         if not self.isSkinnedMesh:
             self.u2 = read_long(self.__meshfile)
-            logging.debug('u2 = %d' % self.u2)
+            logging.debug('u2 = %d', self.u2)
     
     def __load_lods_nodes_rigs(self):
-        logging.debug('starting reading lods tables at %d' % self.__meshfile.tell())
+        logging.debug('starting reading lods tables at %d', self.__meshfile.tell())
         for geom_id, geom in enumerate(self.geoms):
-            logging.debug('reading geom%d at %d' % (geom_id, self.__meshfile.tell()))
+            logging.debug('reading geom%d at %d', geom_id, self.__meshfile.tell())
             for lod_id, lod in enumerate(geom.lods):
-                logging.debug('reading lod%d at %d' % (lod_id, self.__meshfile.tell()))
+                logging.debug('reading lod%d at %d', lod_id, self.__meshfile.tell())
                 lod.load_nodes_rigs(self.__meshfile, self.head.version, self.isBundledMesh, self.isSkinnedMesh)
-        logging.debug('finished reading lods tables at %d' % (self.__meshfile.tell()))
+        logging.debug('finished reading lods tables at %d', self.__meshfile.tell())
 
     def __load_lods_materials(self):
-        logging.debug('starting reading materials at %d' % (self.__meshfile.tell()))
+        logging.debug('starting reading materials at %d', self.__meshfile.tell())
         for geom_id, geom in enumerate(self.geoms):
-            logging.debug('reading geom%d at %d' % (geom_id, self.__meshfile.tell()))
+            logging.debug('reading geom%d at %d', geom_id, self.__meshfile.tell())
             for lod_id, lod in enumerate(geom.lods):
-                logging.debug('reading lod%d at %d' % (lod_id, self.__meshfile.tell()))
+                logging.debug('reading lod%d at %d', lod_id, self.__meshfile.tell())
                 lod.load_materials(self.__meshfile, self.head.version, self.isSkinnedMesh)
-        logging.debug('finished reading materials at %d' % (self.__meshfile.tell()))
+        logging.debug('finished reading materials at %d', self.__meshfile.tell())
     
     def export(self, filename=None, update_bounds=True):
+        # writable binary streams exported as is, without touching filesystem
+        if hasattr(filename, 'write'):
+            filename.write(self.__serialize(update_bounds))
+            return
+
         if not filename: filename = self.filename
-        logging.debug('saving mesh as %s' % filename)
+        logging.debug('saving mesh as %s', filename)
 
         dirname = os.path.dirname(filename)
-        if not os.path.exists(dirname):
+        if dirname and not os.path.exists(dirname):
             os.makedirs(dirname)
-        
-        # update lods&materials bounds first
-        if update_bounds: self.update_boundaries()
 
+        # copy lazy blocks out before target file truncated, could be mapped one
+        for block in (self.__vertices, self.__index):
+            if isinstance(block, _bf2block): block.detach()
+
+        data = self.__serialize(update_bounds)
         with open(filename, 'wb') as vmesh:
-            self.__export(vmesh)
+            vmesh.write(data)
             self.filename = filename
-            
+
+    async def aexport(self, filename=None, update_bounds=True, executor=None):
+        # serializing and writing in executor, not blocking event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self.export, filename, update_bounds)
+
+    def to_bytes(self, update_bounds=True):
+        # immutable copy of exported mesh, safe to hash or use as key
+        return bytes(self.__serialize(update_bounds))
+
+    @trace.timed('export')
+    def __serialize(self, update_bounds=True):
+        # mesh exported into preallocated bytearray, written out without copy
+        # deferred transforms applied before writing vertices
+        if self.__transform is not None: self.__vertex_data()
+        # update lods&materials bounds first
+        if update_bounds: self.update_boundaries()
+
+        data = bytearray(self.export_size())
+        fo = Buffer(data)
+        self.__export(fo)
+        if fo.tell() != len(data):
+            raise AttributeError('exported %d bytes, expected %d' % (fo.tell(), len(data)))
+        trace.count('bytes_written', len(data))
+        return data
+
+    def export_size(self):
+        size = HEADER.size + BYTE.size
+        size += LONG.size + LONG.size * self.geomnum
+        size += LONG.size + VERTATTRIB.size * self.vertattribnum
+        size += VERTBLOCK.size
+        if isinstance(self.__vertices, _bf2block):
+            size += self.__vertices.nbytes
+        else:
+            size += self.__vertex_data().nbytes
+        size += LONG.size
+        if isinstance(self.__index, _bf2block):
+            size += self.__index.nbytes
+        else:
+            size += self.__index_data().nbytes
+        if not self.isSkinnedMesh: size += LONG.size
+        for geom in self.geoms:
+            for lod in geom.lods:
+                size += lod.nodes_size(self.head.version, self.isBundledMesh, self.isSkinnedMesh)
+                size += lod.materials_size(self.head.version, self.isSkinnedMesh)
+        return size
+
     def __export(self, fo):
-        logging.debug('writing header at %d' % fo.tell())
+        logging.debug('writing header at %d', fo.tell())
         self.head.export(fo)
         write_byte(fo, self.u1)
-        logging.debug('writing geom table at %d' % fo.tell())
+        logging.debug('writing geom table at %d', fo.tell())
         write_long(fo, self.geomnum)
         for geom in self.geoms:
             geom.export(fo)
-        logging.debug('writing vertex attributes table at %d' % fo.tell())
+        logging.debug('writing vertex attributes table at %d', fo.tell())
         write_long(fo, self.vertattribnum)
-        for vertex_attributes_table in self.vertex_attributes:
-            vertex_attributes_table.export(fo)
-        logging.debug('writing vertices block at %d' % fo.tell())
-        write_long(fo, self.vertformat)
-        write_long(fo, self.vertstride)
-        write_long(fo, self.vertnum)
-        logging.debug('writing vertices array at %d' % fo.tell())
-        for value in self.vertices:
-            write_float(fo, value)
-        logging.debug('writing %d indices at %d' % (self.indexnum, fo.tell()))
+        write_structs(fo, VERTATTRIB, [(attrib.flag, attrib.offset, attrib.vartype, attrib.usage) for attrib in self.vertex_attributes])
+        logging.debug('writing vertices block at %d', fo.tell())
+        write_struct(fo, VERTBLOCK, self.vertformat, self.vertstride, self.vertnum)
+        logging.debug('writing vertices array at %d', fo.tell())
+        if isinstance(self.__vertices, _bf2block):
+            fo.write(self.__vertices.raw)
+        else:
+            write_array(fo, '<f4', self.__vertex_data())
+        logging.debug('writing %d indices at %d', self.indexnum, fo.tell())
         write_long(fo, self.indexnum)
-        for value in self.index:
-            write_short(fo, value)
+        if isinstance(self.__index, _bf2block):
+            fo.write(self.__index.raw)
+        else:
+            write_array(fo, '<u2', self.__index_data())
         if not self.isSkinnedMesh: write_long(fo, self.u2)
-        logging.debug('writing nodes at %d' % fo.tell())
+        logging.debug('writing nodes at %d', fo.tell())
         for geom in self.geoms:
             for lod in geom.lods:
                 lod.export_nodes(fo, self.head.version, self.isBundledMesh, self.isSkinnedMesh)
-        logging.debug('writing materials at %d' % fo.tell())
+        logging.debug('writing materials at %d', fo.tell())
         for geom in self.geoms:
             for lod in geom.lods:
                 lod.export_materials(fo, self.head.version, self.isSkinnedMesh)
-        logging.debug('exported %d bytes' % fo.tell())
+        logging.debug('exported %d bytes', fo.tell())
     
+    @trace.timed('change_geoms_order')
     def change_geoms_order(self, order):
         if len(order) != len(self.geoms):
             raise AttributeError('new order geoms number not equal, got %d, expected %d' % (len(order), len(self.geoms)))
@@ -251,147 +533,374 @@ class VisibleMesh(BF2Mesh):
         new_geoms = []
         new_vertices = []
         new_index = []
+        vstart = 0
+        istart = 0
 
+        vertices = self.__vertex_data()
+        index = self.__index_data()
         # vertex_size = self.vertstride / self.vertformat
-        vertex_size = sum([len(D3DDECLTYPE(v_attrib.vartype)) for v_attrib in self.vertex_attributes if v_attrib.flag is USED])
+        vertex_size = self.vertex_size
         for geomId in order:
             geom = self.geoms[geomId]
             for lod in geom.lods:
                 for material in lod.materials:
-                    vstart = material.vstart * vertex_size
-                    vend = vstart + material.vnum * vertex_size
-                    new_vertices.extend(self.vertices[vstart:vend])
+                    new_vertices.append(vertices[material.vstart * vertex_size:(material.vstart + material.vnum) * vertex_size])
+                    new_index.append(index[material.istart:material.istart + material.inum])
 
-                    new_index.extend(self.index[material.istart:material.istart+material.inum])
-                    
-                    material.vstart = int(len(new_vertices) / vertex_size) - material.vnum
-                    material.istart = len(new_index) - material.inum
+                    material.vstart = vstart
+                    material.istart = istart
+                    vstart += material.vnum
+                    istart += material.inum
             new_geoms.append(geom)
         
         self.geoms = new_geoms
-        self.vertices = new_vertices
-        self.index = new_index
+        self.vertices = np.concatenate(new_vertices or [vertices[:0]])
+        self.index = np.concatenate(new_index or [index[:0]])
     
-    def translate(self, offset):
-        logging.debug('translating with offset of %s' % str(offset))
-        new_vertices = []
-
+    @trace.timed('translate')
+    def translate(self, offset, start=0, stop=None, geoms=None, lods=None, materials=None):
+        """
+        Moves positions of vertices[start:stop] in place, whole vertex buffer by default
+        geoms, lods, materials select ids of materials whose vertices moved instead of range
+        Bounds of moved materials moved along, vertex range left for rescan
+
+        """
+        logging.debug('translating vertices[%s:%s] with offset of %s', start, stop, offset)
+        ranges = self.__vertex_ranges(start, stop, geoms, lods, materials)
+        if (start, stop) == (0, None):
+            self.__apply(_translation_matrix(offset), ranges, bounds=True)
+            return
+        self.__writable(index=False)
+        position = self.__attribute(D3DDECLUSAGE.POSITION)
+        # adding in double precision, same as python floats did
+        offset = np.asarray(offset, dtype=np.float64)
+        for range_start, range_stop in ranges:
+            data = position[range_start:range_stop]
+            np.add(data, offset, out=data, casting='same_kind')
+            self.__mark_dirty(range_start, range_stop)
+            trace.count('vertices_touched', len(data))
+    
+    @trace.timed('rotate')
+    def rotate(self, rotation, pivot=None, geoms=None, lods=None, materials=None):
+        """
+        Rotates vertices by (yaw, pitch, roll) degrees around pivot point, origin by default
+        Lods and materials bounds refit to rotated positions instead of rescan,
+        on deferred meshes once pending transforms applied or bounds updated
+
+        """
+        logging.debug('rotating by %s around %s', rotation, pivot)
+        matrix = _rotation_matrix(rotation)
+        if pivot is not None:
+            # pivot moved to origin and back
+            pivot = np.asarray(pivot, dtype=np.float64)
+            matrix = _translation_matrix(-pivot) @ matrix @ _translation_matrix(pivot)
+        self.__apply(matrix, self.__vertex_ranges(0, None, geoms, lods, materials), bounds=True)
+
+    @trace.timed('recenter')
+    def recenter(self, mode='bounds', pivot=None):
+        """
+        Moves mesh center to origin, returns center as (x, y, z)
+        bounds - center of all lods bounds
+        centroid - mean of vertex positions
+        pivot - pivot point given, or lod pivot of old mesh versions
+        Lods and materials bounds moved along instead of rescan
+
+        """
+        if mode == 'bounds':
+            # edits made since load folded into bounds first, pending transforms stay pending
+            self.update_boundaries()
+            bounds = np.array([(lod.min, lod.max) for geom in self.geoms for lod in geom.lods if lod.min is not None], dtype=np.float64)
+            if not len(bounds): raise AttributeError('%s has no lods bounds' % self.filename)
+            center = (bounds[:, 0].min(axis=0) + bounds[:, 1].max(axis=0)) / 2
+        elif mode == 'centroid':
+            position = self.__attribute(D3DDECLUSAGE.POSITION)
+            if position is None or not len(position): raise AttributeError('%s has no vertex positions' % self.filename)
+            center = position.mean(axis=0, dtype=np.float64)
+        elif mode == 'pivot':
+            if pivot is None and self.geoms and self.geoms[0].lods: pivot = self.geoms[0].lods[0].pivot
+            if pivot is None: raise AttributeError('%s has no lod pivot, expected pivot point' % self.filename)
+            center = np.asarray(pivot, dtype=np.float64)
+        else:
+            raise AttributeError('unknown recenter mode %s' % mode)
+        logging.debug('recentering %s from %s', self.filename, center)
+        self.__apply(_translation_matrix(-center), [(0, None)], bounds=True)
+        return tuple(center.tolist())
+
+    @trace.timed('scale')
+    def scale(self, factors, geoms=None, lods=None, materials=None):
+        """
+        Scales vertices along x, y, z axes by factors, single number for uniform scale
+        Negative factors mirror mesh, see VisibleMesh.transform, zero factors rejected
+
+        """
+        logging.debug('scaling by %s', factors)
+        matrix = np.identity(4)
+        matrix[[0, 1, 2], [0, 1, 2]] = np.broadcast_to(factors, 3)
+        self.transform(matrix, geoms=geoms, lods=lods, materials=materials)
+
+    @trace.timed('transform')
+    def transform(self, matrix, start=0, stop=None, geoms=None, lods=None, materials=None):
+        """
+        Applies 4x4 affine matrix to vertices[start:stop] in place, whole vertex buffer by default
+        geoms, lods, materials select ids of materials whose vertices transformed instead of range
+        Matrix in row-vector convention of mesh files, translation in last row
+        Positions transformed by whole matrix, normals by inverse-transpose of linear part,
+        tangents&binormals by linear part so they stay perpendicular to normals
+        Mirroring matrices also reverse triangles winding of transformed materials
+        and flip tangents of meshes without stored binormals,
+        binormal = normal x tangent stays right for normal maps
+        Deferred meshes only record whole buffer transforms, see VisibleMesh.deferred
+
+        """
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+        self.__apply(matrix, self.__vertex_ranges(start, stop, geoms, lods, materials))
+
+    def __apply(self, matrix, ranges, bounds=False):
+        # bounds moves lods&materials bounds along, otherwise vertices left for rescan
+        # translations move bounds as is, other linear parts refit bounds to transformed positions
+        # indices not affected by deferring, two mirrors flip winding back
+        if self.__determinant(matrix) < 0: self.__flip_winding(ranges)
+        refit = bounds and not (matrix[:3, :3] == np.identity(3)).all()
+        if bounds: self.__transform_bounds(matrix, ranges, refit)
+        if self.deferred and ranges == [(0, None)]:
+            logging.debug('deferring transform by %s', matrix.tolist())
+            # row vectors, pending transforms applied first
+            self.__transform = matrix if self.__transform is None else self.__transform @ matrix
+            self.__transform_rescan |= not bounds
+            self.__transform_refit |= refit
+            trace.count('transforms_deferred')
+            return
+        for range_start, range_stop in ranges:
+            self.__transform_vertices(matrix, slice(range_start, range_stop), rescan=not bounds)
+        if refit: self.__fit_bounds(self.__material_table()[self.__selected_materials(ranges)])
+
+    def __determinant(self, matrix):
+        # singular linear part flattens mesh, normals could not be transformed
+        determinant = np.linalg.det(matrix[:3, :3])
+        if determinant == 0: raise AttributeError('singular transform matrix %s, expected nonzero scale on every axis' % matrix.tolist())
+        return determinant
+
+    def __transform_bounds(self, matrix, ranges, refit=False):
+        # translated bounds moved as is, boxes around rotated corners would grow on every call
+        # so refit bounds left for __fit_bounds once vertices transformed, only pivots moved
+        whole = ranges == [(0, None)]
+        if not refit:
+            offset = matrix[3, :3]
+            def move(point):
+                return tuple((np.asarray(point, dtype=np.float64) + offset).tolist())
+            table = self.__material_table()
+            for geomId, lodId, materialId in table[self.__selected_materials(ranges)][:, :3]:
+                lod = self.geoms[geomId].lods[lodId]
+                material = lod.materials[materialId]
+                if material.mmin is None: continue
+                material.mmin, material.mmax = move(material.mmin), move(material.mmax)
+                if not whole and lod.min is not None:
+                    # lod holds other materials too, only grows
+                    lod.min = tuple(np.fmin(lod.min, material.mmin).tolist())
+                    lod.max = tuple(np.fmax(lod.max, material.mmax).tolist())
+            if whole:
+                for geom in self.geoms:
+                    for lod in geom.lods:
+                        if lod.min is not None: lod.min, lod.max = move(lod.min), move(lod.max)
+        if not whole: return
+        for geom in self.geoms:
+            for lod in geom.lods:
+                if lod.pivot is not None: lod.pivot = tuple((np.asarray(lod.pivot) @ matrix[:3, :3] + matrix[3, :3]).tolist())
+
+    def __fit_bounds(self, selected, matrix=None):
+        # materials bounds replaced by min&max of their positions, transformed by matrix if given
+        # lods having all materials selected refit, other lods only grow
+        position = self.__pending_positions()
+        if position is None: return
+        boxes = {}
+        for geomId, lodId, materialId, vstart, vnum in selected[selected[:, 4] > 0][:, :5]:
+            data = position[vstart:vstart + vnum]
+            if matrix is not None:
+                # stored as float32 once applied, bounds taken from same values
+                data = (data @ matrix[:3, :3] + matrix[3, :3]).astype(np.float32)
+            box = np.fmin.reduce(data).astype(np.float64), np.fmax.reduce(data).astype(np.float64)
+            material = self.geoms[geomId].lods[lodId].materials[materialId]
+            if material.mmin is not None:
+                material.mmin, material.mmax = tuple(box[0].tolist()), tuple(box[1].tolist())
+            boxes.setdefault((geomId, lodId), []).append(box)
+
+        for (geomId, lodId), lod_boxes in boxes.items():
+            lod = self.geoms[geomId].lods[lodId]
+            if lod.min is None: continue
+            lod_boxes = np.array(lod_boxes)
+            box_min, box_max = np.fmin.reduce(lod_boxes[:, 0]), np.fmax.reduce(lod_boxes[:, 1])
+            if len(lod_boxes) < len([material for material in lod.materials if material.vnum]):
+                box_min, box_max = np.fmin(lod.min, box_min), np.fmax(lod.max, box_max)
+            lod.min, lod.max = tuple(box_min.tolist()), tuple(box_max.tolist())
+
+    def __pending_positions(self):
+        # positions view not applying pending deferred transforms, None if mesh has no positions
+        if isinstance(self.__vertices, _bf2block):
+            self.__vertices = self.__vertices.decode()
+        dtype = self.vertex_dtype
+        if D3DDECLUSAGE.POSITION.name not in dtype.names: return None
+        return self.__vertices.view(dtype)[D3DDECLUSAGE.POSITION.name]
+
+    def __selected_materials(self, ranges):
+        # mask of materials table rows having all vertices in ranges
+        table = self.__material_table()
+        vstart, vstop = table[:, 3], table[:, 3] + table[:, 4]
+        selected = np.zeros(len(table), dtype=bool)
+        for start, stop in ranges:
+            start, stop, _ = slice(start, stop).indices(self.vertnum)
+            selected |= (vstart >= start) & (vstop <= stop)
+        return selected
+
+    def __flip_winding(self, ranges, mask=None):
+        # reverse triangles of materials having all vertices in mirrored ranges
+        # with vertex mask only triangles having all vertices masked
+        # vertices left as is, pending deferred transforms stay pending
+        self.__writable(vertices=False)
+        index = self.__index_data()
+        table = self.__material_table()
+        # materials sharing index range flipped once
+        for istart, inum, vstart in np.unique(table[self.__selected_materials(ranges)][:, [5, 6, 3]], axis=0):
+            logging.debug('reversing winding of indices[%d:%d]', istart, istart + inum)
+            triangles = index[istart:istart + inum - inum % 3].reshape(-1, 3)
+            if mask is None:
+                triangles[:, 1:] = triangles[:, [2, 1]]
+                trace.count('triangles_flipped', len(triangles))
+            else:
+                masked = mask[np.minimum(triangles + vstart, len(mask) - 1)].all(axis=1)
+                triangles[masked, 1:] = triangles[masked][:, [2, 1]]
+                trace.count('triangles_flipped', int(masked.sum()))
+
+    def __vertex_ranges(self, start, stop, geoms, lods, materials):
+        # (start, stop) vertex ranges to edit, selected materials ranges merged where overlap
+        if geoms is None and lods is None and materials is None:
+            return [(start, stop)]
+        if (start, stop) != (0, None):
+            raise AttributeError('vertex range and geoms/lods/materials selection are exclusive')
+
+        ranges = []
         for geomId, geom in enumerate(self.geoms):
-            geom = self.geoms[geomId]
+            if geoms is not None and geomId not in geoms: continue
             for lodId, lod in enumerate(geom.lods):
+                if lods is not None and lodId not in lods: continue
                 for materialId, material in enumerate(lod.materials):
-                    logging.debug('creating copy of geoms[%d].lods[%d].materials[%d] vertices array' % (geomId, lodId, materialId))
-
-                    vstart = material.vstart * self.vertex_size
-                    vend = vstart + material.vnum * self.vertex_size
-
-                    _material_vertices = list(self.vertices[vstart:vend])
-                    logging.debug('material vertices buffer [%d*%d:%d + %d*%d][%d]' % (material.vstart, self.vertex_size,
-                                                                                               vstart, material.vnum, self.vertex_size,
-                                                                                               len(_material_vertices)))
-                    for i in range(0, len(_material_vertices), self.vertex_size):
-                        vertex = _material_vertices[i:i + self.vertex_size]
-                        logging.debug('geoms[%d].lods[%d].materials[%d] vertex buffer[%d:%d][%d]: %s' % (geomId, lodId, materialId,
-                                                                                                        i, i + self.vertex_size, self.vertex_size, vertex))
-
-                        for attrib in self.vertex_attributes:
-                            if attrib.usage == D3DDECLUSAGE.POSITION and attrib.flag != UNUSED:
-                                vertoffset = int(attrib.offset / self.vertformat)
-                                break
-                        
-                        for valueId, value in enumerate(offset):
-                            logging.debug('updating vertex.POSITION[%d]: %s += %s' % (valueId, vertex[vertoffset+valueId], value))
-                            vertex[vertoffset+valueId] += value
-
-                        new_vertices.extend(vertex)
-                        logging.debug('extended vertices array to %d' % (len(new_vertices)))
-        
-        logging.debug('replacing old vertices array of %d size by new vertices array of %d size' % (len(self.vertices), len(new_vertices)))
-        self.vertices = tuple(new_vertices)
+                    if materials is not None and materialId not in materials: continue
+                    if not material.vnum: continue
+                    ranges.append([material.vstart, material.vstart + material.vnum])
+        merged = []
+        for range_start, range_stop in sorted(ranges):
+            if merged and range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_stop)
+            else:
+                merged.append([range_start, range_stop])
+        logging.debug('selected vertex ranges %s', merged)
+        return [tuple(r) for r in merged]
+
+    def __transform_vertices(self, matrix, rows, rescan=True):
+        # rows either slice of vertices or array of vertex ids
+        linear = matrix[:3, :3]
+        logging.debug('transforming vertices %s by %s', rows, matrix.tolist())
+        self.__writable(index=False)
+        # mirrored frame changes handedness, flipping tangent restores binormal
+        # rebuilt from normal and tangent, stored binormal mirrored along as is
+        handedness = np.sign(np.linalg.det(linear))
+        if self.__attribute(D3DDECLUSAGE.BINORMAL) is not None: handedness = 1.0
+        # translation moves positions only, added in place
+        translation = (linear == np.identity(3)).all()
+
+        for usage, linear_part, offset in [
+                (D3DDECLUSAGE.POSITION, linear, matrix[3, :3]),
+                (D3DDECLUSAGE.NORMAL, np.linalg.inv(linear).T, None),
+                (D3DDECLUSAGE.TANGENT, linear * handedness, None),
+                (D3DDECLUSAGE.BINORMAL, linear, None),
+                ]:
+            data = self.__attribute(usage)
+            if data is None: continue
+            if translation:
+                if offset is None: continue
+                if isinstance(rows, slice):
+                    data = data[rows]
+                    np.add(data, offset, out=data, casting='same_kind')
+                else:
+                    data[rows] += offset
+                continue
+            # computing in double precision, stored back as float32
+            new_data = data[rows] @ linear_part
+            if offset is not None: new_data += offset
+            data[rows] = new_data
+        if isinstance(rows, slice):
+            if rescan: self.__mark_dirty(rows.start, rows.stop)
+            trace.count('vertices_touched', len(range(self.vertnum)[rows]))
+        elif len(rows):
+            if rescan: self.__mark_dirty(int(rows.min()), int(rows.max()) + 1)
+            trace.count('vertices_touched', len(rows))
     
-    def rotate(self, rotation):
-        # sorry i suck at math so this much code
-        # rotate around forward(red) axis
-        # pitch
-        def Rpitch(position, angle):
-            x = position[0]
-            y = position[1]
-            z = position[2]
-
-            newX = x
-            newY = y * cos(angle) - z * sin(angle)
-            newZ = y * sin(angle) + z * cos(angle)
-
-            return (newX, newY, newZ)
-
-        # rotate around vertical(green) axis
-        # -angle due to DICE choosing left-handed axis system
-        # yaw
-        def Ryaw(position, angle):
-            x = position[0]
-            y = position[1]
-            z = position[2]
-
-            newX = x * cos(-angle) + z * sin(-angle)
-            newY = y
-            newZ = z * cos(-angle) - x * sin(-angle)
-
-            return (newX, newY, newZ)
-
-        # rotate around side(blue) axis
-        # roll
-        def Rroll(position, angle):
-            x = position[0]
-            y = position[1]
-            z = position[2]
-
-            newX = x * cos(angle) - y * sin(angle)
-            newY = x * sin(angle) + y * cos(angle)
-            newZ = z
-
-            return (newX, newY, newZ)
-
-        logging.debug('rotating by %s' % str(rotation))
-        yaw = radians(rotation[0])
-        pitch = radians(rotation[1])
-        roll = radians(rotation[2])
+    @property
+    def node_ids(self):
+        # (vertnum,) view of vertices node ids, first byte of BLENDINDICES, None if mesh has no such attribute
+        blendindices = self.__attribute(D3DDECLUSAGE.BLENDINDICES)
+        if blendindices is not None: return blendindices[:, 0]
 
-        new_vertices = []
+    @property
+    def node_groups(self):
+        # vertex ids grouped by node id, {node_id: array of vertex ids}
+        node_ids = self.node_ids
+        if node_ids is None: return {}
+        order = np.argsort(node_ids, kind='stable')
+        nodes, starts = np.unique(node_ids[order], return_index=True)
+        return dict(zip(nodes.tolist(), np.split(order, starts[1:])))
+
+    @trace.timed('transform_node')
+    def transform_node(self, node_id, matrix, geoms=None, lods=None, materials=None):
+        """
+        Applies 4x4 affine matrix to vertices of single node, e.g. bundledmesh turret or wheel
+        Node ids count from 0 in every lod, geoms, lods, materials narrow selection, all of them by default
+        Matrix convention same as VisibleMesh.transform, bounds left for rescan
+
+        """
+        node_ids = self.node_ids
+        if node_ids is None: raise AttributeError('%s vertices have no BLENDINDICES node ids' % self.filename)
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+        ranges = self.__vertex_ranges(0, None, geoms, lods, materials)
+        mask = node_ids == node_id
+        if ranges != [(0, None)]:
+            selected = np.zeros(len(mask), dtype=bool)
+            for start, stop in ranges:
+                selected[start:stop] = True
+            mask &= selected
+        vertex_ids = np.flatnonzero(mask)
+        logging.debug('transforming %d vertices of node %d', len(vertex_ids), node_id)
+        if not len(vertex_ids): return
+
+        if self.__determinant(matrix) < 0: self.__flip_winding(ranges, mask)
+        self.__transform_vertices(matrix, vertex_ids)
+
+    @trace.timed('renormalize')
+    def renormalize(self, frames=True):
+        """
+        Normalizes normals, tangents and binormals of whole vertex buffer in place
+        With frames tangents and binormals also made perpendicular to normals and each other, Gram-Schmidt
+        Unused attributes ignored, zero-length vectors left as is
+
+        """
+        logging.debug('renormalizing %s, frames=%s', self.filename, frames)
+        self.__writable(index=False)
+        def normalize(data):
+            lenght = np.linalg.norm(data, axis=1, keepdims=True)
+            return np.divide(data, lenght, out=data, where=lenght > 0)
+
+        previous = []
+        for usage in [D3DDECLUSAGE.NORMAL, D3DDECLUSAGE.TANGENT, D3DDECLUSAGE.BINORMAL]:
+            attribute = self.__attribute(usage)
+            if attribute is None: continue
+            # computing in double precision, stored back as float32
+            data = attribute.astype(np.float64)
+            if frames:
+                for other in previous:
+                    data -= (data * other).sum(axis=1, keepdims=True) * other
+            attribute[:] = normalize(data)
+            previous.append(data)
+        trace.count('vertices_touched', self.vertnum)
 
-        for geomId, geom in enumerate(self.geoms):
-            geom = self.geoms[geomId]
-            for lodId, lod in enumerate(geom.lods):
-                for materialId, material in enumerate(lod.materials):
-                    logging.debug('creating copy of geoms[%d].lods[%d].materials[%d] vertices array' % (geomId, lodId, materialId))
-
-                    vstart = material.vstart * self.vertex_size
-                    vend = vstart + material.vnum * self.vertex_size
-
-                    _material_vertices = list(self.vertices[vstart:vend])
-                    logging.debug('material vertices buffer [%d*%d:%d + %d*%d][%d]' % (material.vstart, self.vertex_size,
-                                                                                            vstart, material.vnum, self.vertex_size,
-                                                                                            len(_material_vertices)))
-                    for i in range(0, len(_material_vertices), self.vertex_size):
-                        vertex = _material_vertices[i:i + self.vertex_size]
-                        logging.debug('geoms[%d].lods[%d].materials[%d] vertex buffer[%d:%d][%d]: %s' % (geomId, lodId, materialId,
-                                                                                                        i, i + self.vertex_size, self.vertex_size, vertex))
-
-                        for attrib in self.vertex_attributes:
-                            if attrib.flag == UNUSED: continue
-                            if attrib.usage in [D3DDECLUSAGE.POSITION, D3DDECLUSAGE.NORMAL, D3DDECLUSAGE.TANGENT]:
-                                vertoffset = int(attrib.offset / self.vertformat)
-                                data = vertex[vertoffset:vertoffset+len(D3DDECLTYPE(attrib.vartype))]
-                                logging.debug('updating vertex.%s: %s' % (D3DDECLUSAGE(attrib.usage).name, data))
-                                new_data = Ryaw(Rpitch(Rroll(data, roll), pitch), yaw)
-                                vertex[vertoffset:vertoffset+len(D3DDECLTYPE(attrib.vartype))] = new_data
-                                logging.debug('updated vertex.%s: %s' % (D3DDECLUSAGE(attrib.usage).name, data))
-
-                        new_vertices.extend(vertex)
-                        logging.debug('extended vertices array to %d' % (len(new_vertices)))
-        
-        logging.debug('replacing old vertices array of %d size by new vertices array of %d size' % (len(self.vertices), len(new_vertices)))
-        self.vertices = tuple(new_vertices)
-    
     def canMerge(self, other):
         # support only "same" meshes for now
         if len(self.geoms) != len(other.geoms): return False
@@ -417,8 +926,9 @@ class VisibleMesh(BF2Mesh):
         return True
 
     # DELET THIS IF YOU FEEL CAN WRITE BETTER
+    @trace.timed('merge')
     def merge(self, other):
-        logging.debug('merging %s to %s' % (other.filename, self.filename))
+        logging.debug('merging %s to %s', other.filename, self.filename)
         ####################################################
         # I'M VERY SORRY FUTURE ME IF YOU HAVE TO DEBUG THIS
         ####################################################
@@ -431,65 +941,46 @@ class VisibleMesh(BF2Mesh):
         vertnum = 0
         indexnum = 0
 
+        vertices, other_vertices = self.__vertex_data(), other.__vertex_data()
+        index, other_index = self.__index_data(), other.__index_data()
+
         # TODO: make merge as transaction?
 
         for geomId, geom in enumerate(self.geoms):
             for lodId, lod in enumerate(geom.lods):
                 for materialId, material in enumerate(lod.materials):
-                    logging.debug('adding vertices from geoms[%d].lods[%d].materials[%d]' % (geomId, lodId, materialId))
+                    logging.debug('adding vertices from geoms[%d].lods[%d].materials[%d]', geomId, lodId, materialId)
                     # adding old data
                     _vstart = material.vstart * self.vertex_size
                     _vend = _vstart + self.vertex_size * material.vnum
-                    new_vertices.extend(self.vertices[_vstart:_vend])
-                    logging.debug('extended vertices array to %d by self.vertices[%d:%d]' % (len(new_vertices), _vstart, _vend))
-                    new_index.extend(self.index[material.istart:material.istart + material.inum])
-                    logging.debug('extended index array to %d by self.index[%d:%d]' % (len(new_index), material.istart, material.istart + material.inum))
+                    new_vertices.append(vertices[_vstart:_vend])
+                    logging.debug('extended vertices array by self.vertices[%d:%d]', _vstart, _vend)
+                    new_index.append(index[material.istart:material.istart + material.inum])
+                    logging.debug('extended index array by self.index[%d:%d]', material.istart, material.istart + material.inum)
 
                     # adding new data
                     other_material = other.geoms[geomId].lods[lodId].materials[materialId]
                     _vstart = other_material.vstart * other.vertex_size
                     _vend = _vstart + other.vertex_size * other_material.vnum
-                    new_vertices.extend(other.vertices[_vstart:_vend])
-                    logging.debug('extended vertices array to %d by other.vertices[%d:%d]' % (len(new_vertices), _vstart, _vend))
-                    for indexId in range(other_material.inum):
-                        index = other.index[other_material.istart + indexId]
-                        corrected_index = index + material.vnum
-                        if corrected_index > int('0xffff', 16): raise OverflowError
-                        new_index.append(corrected_index)
-                    logging.debug('extended index array to %d by other.index[%d:%d], corrected by materials[%d].vnum %d' % (
-                                                                                                        len(new_index),
-                                                                                                        other_material.istart,
-                                                                                                        other_material.istart + other_material.inum,
-                                                                                                        materialId,
-                                                                                                        material.vnum))
+                    new_vertices.append(other_vertices[_vstart:_vend])
+                    logging.debug('extended vertices array by other.vertices[%d:%d]', _vstart, _vend)
+                    corrected_index = other_index[other_material.istart:other_material.istart + other_material.inum].astype(np.uint32) + material.vnum
+                    if corrected_index.size and corrected_index.max() > int('0xffff', 16): raise OverflowError
+                    new_index.append(corrected_index.astype('<u2'))
+                    trace.count('indices_rebased', corrected_index.size)
+                    logging.debug('extended index array by other.index[%d:%d], corrected by materials[%d].vnum %d', other_material.istart, other_material.istart + other_material.inum, materialId, material.vnum)
                     
                     # correcting material numbers
-                    logging.debug('corecting materials[%d].vnum = %d, materials[%d].inum = %d' % (
-                                                                                                materialId,
-                                                                                                material.vnum,
-                                                                                                materialId,
-                                                                                                material.inum))
+                    logging.debug('corecting materials[%d].vnum = %d, materials[%d].inum = %d', materialId, material.vnum, materialId, material.inum)
                     material.vnum += other_material.vnum
                     material.inum += other_material.inum
-                    logging.debug('corrected materials[%d].vnum = %d, materials[%d].inum = %d' % (
-                                                                                                materialId,
-                                                                                                material.vnum,
-                                                                                                materialId,
-                                                                                                material.inum))
+                    logging.debug('corrected materials[%d].vnum = %d, materials[%d].inum = %d', materialId, material.vnum, materialId, material.inum)
 
                     # correcting material offsets
-                    logging.debug('corecting materials[%d].vstart = %d, materials[%d].istart = %d' % (
-                                                                                                materialId,
-                                                                                                material.vstart,
-                                                                                                materialId,
-                                                                                                material.istart))
+                    logging.debug('corecting materials[%d].vstart = %d, materials[%d].istart = %d', materialId, material.vstart, materialId, material.istart)
                     material.vstart = vstart
                     material.istart = istart
-                    logging.debug('corrected materials[%d].vstart = %d, materials[%d].istart = %d' % (
-                                                                                                materialId,
-                                                                                                material.vstart,
-                                                                                                materialId,
-                                                                                                material.istart))
+                    logging.debug('corrected materials[%d].vstart = %d, materials[%d].istart = %d', materialId, material.vstart, materialId, material.istart)
 
                     vstart += material.vnum
                     istart += material.inum
@@ -499,67 +990,275 @@ class VisibleMesh(BF2Mesh):
                     indexnum += material.inum
 
         
-        logging.debug('replacing old vertices array of %d size by new vertices array of %d size' % (len(self.vertices), len(new_vertices)))
-        self.vertices = tuple(new_vertices)
-        logging.debug('replacing old index array of %d size by new index array of %d size' % (len(self.index), len(new_index)))
-        self.index = tuple(new_index)
-        logging.debug('self.vertnum: %d -> %d' % (self.vertnum, vertnum))
+        new_vertices = np.concatenate(new_vertices or [vertices[:0]])
+        new_index = np.concatenate(new_index or [index[:0]])
+        logging.debug('replacing old vertices array of %d size by new vertices array of %d size', len(vertices), len(new_vertices))
+        self.vertices = new_vertices
+        logging.debug('replacing old index array of %d size by new index array of %d size', len(index), len(new_index))
+        self.index = new_index
+        logging.debug('self.vertnum: %d -> %d', self.vertnum, vertnum)
         self.vertnum = vertnum
-        logging.debug('self.indexnum: %d -> %d' % (self.indexnum, indexnum))
+        logging.debug('self.indexnum: %d -> %d', self.indexnum, indexnum)
         self.indexnum = indexnum
     
-    def update_boundaries(self):
-        logging.debug('updating %s boundaries' % self.filename)
-        class _vertex(object):
-            pass
+    def __material_table(self):
+        # (geomId, lodId, materialId, vstart, vnum, istart, inum) per material
+        return np.array([(geomId, lodId, materialId, material.vstart, material.vnum, material.istart, material.inum)
+                            for geomId, geom in enumerate(self.geoms)
+                            for lodId, lod in enumerate(geom.lods)
+                            for materialId, material in enumerate(lod.materials)], dtype=np.int64).reshape(-1, 7)
+
+    @trace.timed('validate')
+    def validate(self):
+        """
+        Structural checks of loaded mesh, returns list of found problems
+        Empty list means mesh is safe to edit and export
+
+        """
+        problems = []
+        vertices = self.__vertex_data()
+        index = self.__index_data()
+        table = self.__material_table()
+        names = ['geoms[%d].lods[%d].materials[%d]' % tuple(row[:3]) for row in table]
+        vstart, vnum, istart, inum = table[:, 3], table[:, 4], table[:, 5], table[:, 6]
+
+        vertices_valid = not self.vertformat or len(vertices) == self.vertnum * self.vertstride // self.vertformat
+        if not vertices_valid:
+            problems.append('vertices array size %d does not match vertnum %d' % (len(vertices), self.vertnum))
+        if len(index) != self.indexnum:
+            problems.append('index array size %d does not match indexnum %d' % (len(index), self.indexnum))
+
+        # material ranges
+        for i in np.flatnonzero((vstart < 0) | (vstart + vnum > self.vertnum)):
+            problems.append('%s vertices [%d:%d] out of vertnum %d' % (names[i], vstart[i], vstart[i] + vnum[i], self.vertnum))
+        index_valid = (istart >= 0) & (istart + inum <= len(index))
+        for i in np.flatnonzero(~index_valid):
+            problems.append('%s indices [%d:%d] out of indexnum %d' % (names[i], istart[i], istart[i] + inum[i], self.indexnum))
+
+        # indices of every material should address only its own vertices
+        valid = np.flatnonzero(index_valid & (inum > 0))
+        if valid.size:
+            owner = np.repeat(valid, inum[valid])
+            positions = np.arange(owner.size) - np.repeat(np.cumsum(inum[valid]) - inum[valid], inum[valid]) + istart[owner]
+            invalid = np.bincount(owner, weights=(index[positions] >= vnum[owner]), minlength=len(table))
+            for i in np.flatnonzero(invalid):
+                problems.append('%s has %d indices out of its vnum %d' % (names[i], invalid[i], vnum[i]))
+
+        # overlapping ranges, every range compared with one reaching furthest before it
+        for label, start, num in [('vertices', vstart, vnum), ('indices', istart, inum)]:
+            ids = np.flatnonzero(num > 0)
+            ids = ids[np.argsort(start[ids], kind='stable')]
+            stop = (start + num)[ids]
+            furthest = np.maximum.accumulate(np.where(stop == np.maximum.accumulate(stop), np.arange(len(ids)), 0))
+            overlap = np.flatnonzero(start[ids][1:] < stop[furthest][:-1])
+            for a, b in zip(ids[furthest[overlap]], ids[overlap + 1]):
+                problems.append('%s %s overlap %s' % (names[a], label, names[b]))
+
+        # broken positions, attribute view needs whole vertices
+        position = self.__attribute(D3DDECLUSAGE.POSITION) if vertices_valid else None
+        if position is not None:
+            broken = np.flatnonzero(~np.isfinite(position).all(axis=1))
+            if broken.size:
+                problems.append('%d vertices have NaN or Inf position, first at %d' % (broken.size, broken[0]))
+
+        for problem in problems:
+            logging.debug('%s: %s', self.filename, problem)
+        return problems
+
+    @trace.timed('update_boundaries')
+    def update_boundaries(self, full=False):
+        """
+        Grows lods and materials bounds to enclose vertex positions, existing bounds never shrink
+        Only materials with vertices edited since load or last update rescanned, all of them if full
+        Only version 11 non-skinned meshes have material bounds, lods bounds updated along with them
+
+        """
+        logging.debug('updating %s boundaries', self.filename)
+        # NOTE: I HAVE NO IDEA WHY ADDING MARGIN FIXES RENDER IN ENGINE(not bfmeshview)
+        # TODO: 
+        if self.isSkinnedMesh or self.head.version != 11:
+            self.__dirty = []
+            return
+        if self.__transform is not None:
+            # pending transforms not applied to bounds mark whole buffer dirty when applied
+            if self.__transform_rescan: self.__vertex_data()
+            # pending rotations refit from positions they will have, matrix stays pending
+            elif self.__transform_refit:
+                self.__fit_bounds(self.__material_table(), self.__transform)
+                self.__transform_refit = False
+        dirty, self.__dirty = self.__dirty, []
+        table = self.__material_table()
+        vstart, vstop = table[:, 3], table[:, 3] + table[:, 4]
+        selected = np.zeros(len(table), dtype=bool) if not full else np.ones(len(table), dtype=bool)
+        for start, stop in dirty:
+            selected |= (vstart < stop) & (vstop > start)
+        table = table[selected & (table[:, 4] > 0)]
+        logging.debug('updating bounds of %d materials', len(table))
+        # nothing to rescan, lazy blocks and pending transforms left as is
+        if not len(table): return
+        position = self.__attribute(D3DDECLUSAGE.POSITION)
+        if position is None: return
+
+        # interleaved (start, stop) indices, every even reduceat segment is one material vertex range
+        # extra row keeps stop index of last vertex valid
+        data = np.concatenate([position, position[:1]])
+        segments = np.column_stack([table[:, 3], table[:, 3] + table[:, 4]]).ravel()
+        # fmin&fmax skip NaN positions, same as comparisons did
+        segment_min = np.fmin.reduceat(data, segments)[::2].astype(np.float64)
+        segment_max = np.fmax.reduceat(data, segments)[::2].astype(np.float64)
+
+        for (geomId, lodId, materialId), vertices_min, vertices_max in zip(table[:, :3], segment_min, segment_max):
+            lod = self.geoms[geomId].lods[lodId]
+            material = lod.materials[materialId]
+            material.mmin = tuple(np.fmin(material.mmin, vertices_min).tolist())
+            material.mmax = tuple(np.fmax(material.mmax, vertices_max).tolist())
+            lod.min = tuple(np.fmin(lod.min, vertices_min).tolist())
+            lod.max = tuple(np.fmax(lod.max, vertices_max).tolist())
+        trace.count('vertices_touched', int(table[:, 4].sum()))
+
+
+class _bf2sequence(Sequence):
+    """
+    Tuple-like read access to vertices array, slices returned as tuples
+
+    """
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return tuple(self.array[key].tolist())
+        return self.array[key].item()
+
+    def __iter__(self):
+        return iter(self.array.tolist())
+
+    def __eq__(self, other):
+        if isinstance(other, _bf2sequence):
+            return np.array_equal(self.array, other.array)
+        if not isinstance(other, (tuple, list)): return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+
+def _translation_matrix(offset):
+    # 4x4 row-vector matrix moving by offset
+    matrix = np.identity(4)
+    matrix[3, :3] = offset
+    return matrix
+
+def _rotation_matrix(rotation):
+    """
+    4x4 row-vector matrix of (yaw, pitch, roll) rotation in degrees
+    Applied roll first, then pitch around forward(red) axis, then yaw around vertical(green) axis
+    Yaw angle negated due to DICE choosing left-handed axis system
+
+    """
+    yaw, pitch, roll = [radians(angle) for angle in rotation]
+    Rroll = np.array([
+        [cos(roll), -sin(roll), 0.0],
+        [sin(roll), cos(roll), 0.0],
+        [0.0, 0.0, 1.0]])
+    Rpitch = np.array([
+        [1.0, 0.0, 0.0],
+        [0.0, cos(pitch), -sin(pitch)],
+        [0.0, sin(pitch), cos(pitch)]])
+    Ryaw = np.array([
+        [cos(-yaw), 0.0, sin(-yaw)],
+        [0.0, 1.0, 0.0],
+        [-sin(-yaw), 0.0, cos(-yaw)]])
+    matrix = np.identity(4)
+    # column-vector rotations composed, transposed for row vectors
+    matrix[:3, :3] = (Ryaw @ Rpitch @ Rroll).T
+    return matrix
+
+def scan(filename):
+    """
+    Reads mesh tables only: header, geoms&lods, vertex attributes, vertnum/indexnum and materials
+    Vertex and index blocks skipped with seek(), read from file on first access
+
+    """
+    return VisibleMesh(filename, scan=True)
 
-        for geomId, geom in enumerate(self.geoms):
-            for lodId, lod in enumerate(geom.lods):
-                lod_min = list(lod.min)
-                lod_max = list(lod.max)
-                logging.debug('self.geoms[%d].lods[%d].min = %s' % (geomId, lodId, lod_min))
-                logging.debug('self.geoms[%d].lods[%d].max = %s' % (geomId, lodId, lod_max))
-                for materialId, material in enumerate(lod.materials):
-                    if not self.isSkinnedMesh and self.head.version == 11:
-                        material_min = list(material.mmin)
-                        material_max = list(material.mmax)
-                        logging.debug('self.geoms[%d].lods[%d].materials[%d].mmin = %s' % (geomId, lodId, materialId, material_min))
-                        logging.debug('self.geoms[%d].lods[%d].materials[%d].mmax = %s' % (geomId, lodId, materialId, material_max))
-                    for vertId in range(material.vnum):
-                        # create vertex
-                        _start = (material.vstart + vertId) * self.vertex_size
-                        _end = _start + self.vertex_size
-                        vertexBuffer = self.vertices[_start:_end]
-                        vertex = _vertex()
-                        for attrib in self.vertex_attributes:
-                            if attrib.flag is UNUSED: continue
-                            _start = int(attrib.offset / self.vertformat)
-                            _end = _start + len(D3DDECLTYPE(attrib.vartype))
-                            setattr(vertex, D3DDECLUSAGE(attrib.usage).name, vertexBuffer[_start:_end])
-                        # update material and lod bounds
-                        # NOTE: I HAVE NO IDEA WHY ADDING MARGIN FIXES RENDER IN ENGINE(not bfmeshview)
-                        # TODO: 
-                        if not self.isSkinnedMesh and self.head.version == 11:
-                            for id_axis, axis in enumerate(material_min):
-                                position = getattr(vertex, 'POSITION')
-                                if position[id_axis] < material_min[id_axis]:
-                                    logging.debug('geoms[%d].lods[%d].materials[%d].mmin(%d): %s > %s, updating' % (geomId, lodId, materialId, id_axis, material_min[id_axis], position[id_axis]))
-                                    material_min[id_axis] = position[id_axis]
-                                if position[id_axis] < lod_min[id_axis]:
-                                    logging.debug('geoms[%d].lods[%d].min(%d): %s > %s, updating' % (geomId, lodId, id_axis, lod_min[id_axis], position[id_axis]))
-                                    lod_min[id_axis] = position[id_axis]
-                            for id_axis, axis in enumerate(material_max):
-                                if position[id_axis] > material_max[id_axis]:
-                                    logging.debug('geoms[%d].lods[%d].materials[%d].mmin(%d): %s > %s, updating' % (geomId, lodId, materialId, id_axis, material_max[id_axis], position[id_axis]))
-                                    material_max[id_axis] = position[id_axis]
-                                if position[id_axis] > lod_max[id_axis]:
-                                    logging.debug('geoms[%d].lods[%d].min(%d): %s > %s, updating' % (geomId, lodId, id_axis, lod_max[id_axis], position[id_axis]))
-                                    lod_max[id_axis] = position[id_axis]
-                    if not self.isSkinnedMesh and self.head.version == 11:
-                        material.mmin = tuple(material_min)
-                        material.mmax = tuple(material_max)
-                lod.min = tuple(lod_min)
-                lod.max = tuple(lod_max)
+
+async def aload(filename, executor=None, **kwargs):
+    """
+    Reads and parses mesh in executor, not blocking event loop
+    Meshes are picklable, so process pool executor works too
+
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(VisibleMesh, filename, **kwargs))
+
+
+class _bf2block:
+    """
+    Not decoded vertex/index block, holds view into mapped file
+    or offset in file for scanned meshes
+
+    """
+    def __init__(self, fo, reader, num, size, mapped=None):
+        self.offset = fo.tell()
+        self.nbytes = num * size
+        self.reader = reader
+        self.num = num
+        if isinstance(fo, Buffer):
+            self.view = memoryview(fo.data)[self.offset:self.offset + self.nbytes]
+            # mapped blocks see file rewritten in place, size&mtime tell if it was
+            self.filename, stat = mapped or (None, None)
+        else:
+            # absolute path survives chdir, size&mtime tell if file replaced since scan
+            self.filename = os.path.abspath(fo.name)
+            stat = os.fstat(fo.fileno())
+            self.view = None
+        if stat: self.stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        fo.seek(self.nbytes, 1)
+
+    def check(self):
+        # mapping keeps data of file replaced by other one, only in place rewrite changes it
+        if self.view is None or self.filename is None: return
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return
+        if stat.st_ino == self.stat[0] and (stat.st_size, stat.st_mtime_ns) != self.stat[1:]:
+            raise AttributeError('%s changed since mapped' % self.filename)
+
+    def read(self):
+        # raw block of scanned mesh file
+        with open(self.filename, 'rb') as fo:
+            stat = os.fstat(fo.fileno())
+            if (stat.st_size, stat.st_mtime_ns) != self.stat[1:]:
+                raise AttributeError('%s changed since scanned' % self.filename)
+            fo.seek(self.offset)
+            return fo.read(self.nbytes)
+
+    @property
+    def raw(self):
+        # raw block bytes, scanned ones read from file
+        if self.view is None: return self.read()
+        self.check()
+        return self.view
+
+    def detach(self):
+        # copy raw block into memory, keeping it encoded
+        data = bytes(self.raw)
+        if self.view is not None: self.view.release()
+        self.filename = None
+        self.view = memoryview(data)
+
+    def decode(self):
+        if self.view is None:
+            return self.reader(Buffer(self.read()), self.num)
+        self.check()
+        data = self.reader(Buffer(self.view), self.num)
+        self.view.release()
+        return data
 
 
 class _bf2head:
@@ -575,23 +1274,15 @@ class _bf2head:
         self.u5 = None
 
     def load(self, fo):
-        self.u1 = read_long(fo)
-        self.version = read_long(fo)
-        self.u3 = read_long(fo)
-        self.u4 = read_long(fo)
-        self.u5 = read_long(fo)
-        logging.debug('head.u1 = %d' % self.u1)
-        logging.debug('head.version = %d' % self.version)
-        logging.debug('head.u3 = %d' % self.u3)
-        logging.debug('head.u4 = %d' % self.u4)
-        logging.debug('head.u5 = %d' % self.u5)
+        self.u1, self.version, self.u3, self.u4, self.u5 = read_struct(fo, HEADER)
+        logging.debug('head.u1 = %d', self.u1)
+        logging.debug('head.version = %d', self.version)
+        logging.debug('head.u3 = %d', self.u3)
+        logging.debug('head.u4 = %d', self.u4)
+        logging.debug('head.u5 = %d', self.u5)
     
     def export(self, fo):
-        write_long(fo, self.u1)
-        write_long(fo, self.version)
-        write_long(fo, self.u3)
-        write_long(fo, self.u4)
-        write_long(fo, self.u5)
+        write_struct(fo, HEADER, self.u1, self.version, self.u3, self.u4, self.u5)
 
 
     def __eq__(self, other):
@@ -636,77 +1327,71 @@ class _bf2mat:
 
     def __eq__(self, other):
         if self.alphamode != other.alphamode:
-            logging.debug('\nmaterial.alphamode = %r\nother.alphamode = %r' % (self.alphamode, other.alphamode))
+            logging.debug('\nmaterial.alphamode = %r\nother.alphamode = %r', self.alphamode, other.alphamode)
             return False
         if self.fxfile != other.fxfile:
-            logging.debug('\nmaterial.fxfile = %s\nother.fxfile = %s' % (self.fxfile, other.fxfile))
+            logging.debug('\nmaterial.fxfile = %s\nother.fxfile = %s', self.fxfile, other.fxfile)
             return False
         if self.technique != other.technique:
-            logging.debug('\nmaterial.technique = %s\nother.technique = %s' % (self.technique, other.technique))
+            logging.debug('\nmaterial.technique = %s\nother.technique = %s', self.technique, other.technique)
             return False
         if self.mapnum != other.mapnum:
-            logging.debug('\nmaterial.mapnum = %d\nother.mapnum = %d' % (self.mapnum, other.mapnum))
+            logging.debug('\nmaterial.mapnum = %d\nother.mapnum = %d', self.mapnum, other.mapnum)
             return False
         if self.maps != other.maps:
-            logging.debug('\nmaterial.maps = %s\nother.maps = %s' % (str(self.maps), str(other.maps)))
+            logging.debug('\nmaterial.maps = %s\nother.maps = %s', str(self.maps), str(other.maps))
             return False
         if self.vstart != other.vstart:
-            logging.debug('\nmaterial.vstart = %d\nother.vstart = %d' % (self.vstart, other.vstart))
+            logging.debug('\nmaterial.vstart = %d\nother.vstart = %d', self.vstart, other.vstart)
             return False
         if self.istart != other.istart:
-            logging.debug('\nmaterial.istart = %d\nother.vstart = %d' % (self.istart, other.istart))
+            logging.debug('\nmaterial.istart = %d\nother.vstart = %d', self.istart, other.istart)
             return False
         if self.inum != other.inum:
-            logging.debug('\nmaterial.inum = %d\nother.inum = %d' % (self.inum, other.inum))
+            logging.debug('\nmaterial.inum = %d\nother.inum = %d', self.inum, other.inum)
             return False
         if self.vnum != other.vnum:
-            logging.debug('\nmaterial.vnum = %d\nother.vnum = %d' % (self.vnum, other.vnum))
+            logging.debug('\nmaterial.vnum = %d\nother.vnum = %d', self.vnum, other.vnum)
             return False
         if self.u4 != other.u4:
-            logging.debug('\nmaterial.u4 = %d\nother.u4 = %d' % (self.u4, other.u4))
+            logging.debug('\nmaterial.u4 = %d\nother.u4 = %d', self.u4, other.u4)
             return False
         if self.u5 != other.u5:
-            logging.debug('\nmaterial.u5 = %d\nother.u5 = %d' % (self.u5, other.u5))
+            logging.debug('\nmaterial.u5 = %d\nother.u5 = %d', self.u5, other.u5)
             return False
         if self.mmin != other.mmin:
-            logging.debug('\nmaterial.mmin = (%d, %d, %d)\nother.mmin = (%d, %d, %d)' % (*self.mmin, *other.mmin))
+            logging.debug('\nmaterial.mmin = (%d, %d, %d)\nother.mmin = (%d, %d, %d)', *self.mmin, *other.mmin)
             return False
         return True
 
     def load(self, fo, version, isSkinnedMesh):
         if not isSkinnedMesh:
             self.alphamode = read_long(fo)
-            logging.debug('alphamode = %d' % self.alphamode)
+            logging.debug('alphamode = %d', self.alphamode)
         self.fxfile = read_string(fo)
         self.technique = read_string(fo)
-        logging.debug('fxfile = %s' % self.fxfile)
-        logging.debug('technique = %s' % self.technique)
+        logging.debug('fxfile = %s', self.fxfile)
+        logging.debug('technique = %s', self.technique)
 
         self.mapnum = read_long(fo)
         self.maps = [read_string(fo) for i in range(self.mapnum)]
-        logging.debug('mapnum = %d' % self.mapnum)
+        logging.debug('mapnum = %d', self.mapnum)
         for texturename in self.maps:
-            logging.debug('map = %s' % texturename)
-
-        self.vstart = read_long(fo)
-        self.istart = read_long(fo)
-        self.inum = read_long(fo)
-        self.vnum = read_long(fo)
-        logging.debug('vstart = %d' % self.vstart)
-        logging.debug('istart = %d' % self.istart)
-        logging.debug('inum = %d' % self.inum)
-        logging.debug('vnum = %d' % self.vnum)
-
-        self.u4 = read_long(fo)
-        self.u5 = read_long(fo)
-        logging.debug('u4 = %d' % self.u4)
-        logging.debug('u5 = %d' % self.u5)
+            logging.debug('map = %s', texturename)
+
+        self.vstart, self.istart, self.inum, self.vnum, self.u4, self.u5 = read_struct(fo, MATERIAL)
+        logging.debug('vstart = %d', self.vstart)
+        logging.debug('istart = %d', self.istart)
+        logging.debug('inum = %d', self.inum)
+        logging.debug('vnum = %d', self.vnum)
+        logging.debug('u4 = %d', self.u4)
+        logging.debug('u5 = %d', self.u5)
 
         if not isSkinnedMesh and version == 11:
             self.mmin = read_float3(fo)
             self.mmax = read_float3(fo)
-            logging.debug('mmin = ({})'.format(*self.mmin))
-            logging.debug('mmax = ({})'.format(*self.mmax))
+            logging.debug('mmin = (%g, %g, %g)', *self.mmin)
+            logging.debug('mmax = (%g, %g, %g)', *self.mmax)
 
     def export(self, fo, version, isSkinnedMesh):
         if not isSkinnedMesh:
@@ -719,18 +1404,30 @@ class _bf2mat:
         for texturename in self.maps:
             write_string(fo, texturename)
 
-        write_long(fo, self.vstart)
-        write_long(fo, self.istart)
-        write_long(fo, self.inum)
-        write_long(fo, self.vnum)
-
-        write_long(fo, self.u4)
-        write_long(fo, self.u5)
+        write_struct(fo, MATERIAL, self.vstart, self.istart, self.inum, self.vnum, self.u4, self.u5)
 
         if not isSkinnedMesh and version == 11:
             write_float3(fo, *self.mmin)
             write_float3(fo, *self.mmax)
 
+    def size(self, version, isSkinnedMesh):
+        size = 0
+        if not isSkinnedMesh:
+            size += LONG.size
+
+        size += LONG.size + len(self.fxfile)
+        size += LONG.size + len(self.technique)
+
+        size += LONG.size
+        for texturename in self.maps:
+            size += LONG.size + len(texturename)
+
+        size += MATERIAL.size
+
+        if not isSkinnedMesh and version == 11:
+            size += FLOAT3.size * 2
+        return size
+
 class _bf2geom:
     """
     Geometry structure table, stores info about lods inheritance from geoms, and materials
@@ -743,7 +1440,7 @@ class _bf2geom:
     def load(self, fo):
         self.lodnum = read_long(fo)
         self.lods = [_bf2lod() for i in range(self.lodnum)]
-        logging.debug('geom.lodnum = %d' % self.lodnum)
+        logging.debug('geom.lodnum = %d', self.lodnum)
     
     def export(self, fo):
         write_long(fo, self.lodnum)
@@ -780,37 +1477,37 @@ class _bf2lod:
     
     def __eq__(self, other):
         if self.min != other.min:
-            logging.debug('\nlod.min = (%g, %g, %g)\nother.min = (%g, %g, %g)' % (*self.min, *other.min))
+            logging.debug('\nlod.min = (%g, %g, %g)\nother.min = (%g, %g, %g)', *self.min, *other.min)
             return False
         if self.max != other.max:
-            logging.debug('\nlod.max = (%g, %g, %g)\nother.max = (%g, %g, %g)' % (*self.max, *other.max))
+            logging.debug('\nlod.max = (%g, %g, %g)\nother.max = (%g, %g, %g)', *self.max, *other.max)
             return False
         if self.pivot != other.pivot:
-            logging.debug('\nlod.pivot = (%g, %g, %g)\nother.pivot = (%g, %g, %g)' % (*self.pivot, *other.pivot))
+            logging.debug('\nlod.pivot = (%g, %g, %g)\nother.pivot = (%g, %g, %g)', *self.pivot, *other.pivot)
             return False
         if self.rignum != other.rignum:
-            logging.debug('\nlod.rignum = %d\nother.rignum = %d' % (self.rignum, other.rignum))
+            logging.debug('\nlod.rignum = %d\nother.rignum = %d', self.rignum, other.rignum)
             return False
         for rigId, rig in enumerate(self.rigs):
             other_rig = other.rigs[rigId]
             if rig != other_rig:
-                logging.debug('\nlod.rigs[%d] = %s\nother.rigs[%d] = %s' % (rigId, str(rig), rigId, str(other_rig)))
+                logging.debug('\nlod.rigs[%d] = %s\nother.rigs[%d] = %s', rigId, str(rig), rigId, str(other_rig))
                 return False
         if self.nodenum != other.nodenum:
-            logging.debug('\nlod.nodenum = %d\nother.nodenum = %d' % (self.nodenum, other.nodenum))
+            logging.debug('\nlod.nodenum = %d\nother.nodenum = %d', self.nodenum, other.nodenum)
             return False
         for nodeId, node in enumerate(self.nodes):
             other_node = other.nodes[nodeId]
             if node != other_node:
-                logging.debug('\nlod.nodes[%d] = %s\nother.nodes[%d] = %s' % (nodeId, str(node), nodeId, str(other_node)))
+                logging.debug('\nlod.nodes[%d] = %s\nother.nodes[%d] = %s', nodeId, str(node), nodeId, str(other_node))
                 return False
         if self.matnum != other.matnum:
-            logging.debug('\nlod.matnum = %d\nother.matnum = %d' % (self.matnum, other.matnum))
+            logging.debug('\nlod.matnum = %d\nother.matnum = %d', self.matnum, other.matnum)
             return False
         for materialId, material in enumerate(self.materials):
             other_material = other.materials[materialId]
             if material != other_material:
-                logging.debug('\nlod.material[%d] = %s\nother.material[%d] = %s' % (materialId, str(material), materialId, str(other_material)))
+                logging.debug('\nlod.material[%d] = %s\nother.material[%d] = %s', materialId, str(material), materialId, str(other_material))
                 return False
         return True
 
@@ -820,23 +1517,23 @@ class _bf2lod:
     def load_nodes_rigs(self, fo, version, isBundledMesh, isSkinnedMesh):
         self.min = read_float3(fo)
         self.max = read_float3(fo)
-        logging.debug('lod.min = ({})'.format(*self.min))
-        logging.debug('lod.max = ({})'.format(*self.max))
+        logging.debug('lod.min = (%g, %g, %g)', *self.min)
+        logging.debug('lod.max = (%g, %g, %g)', *self.max)
 
         if version <= 6: # some old meshes, version 4, 6
             self.pivot = read_float3(fo)
-            logging.debug('lod.pivot = ({})'.format(*self.pivot))
+            logging.debug('lod.pivot = (%g, %g, %g)', *self.pivot)
 
         if isSkinnedMesh:
             self.rignum = read_long(fo)
-            logging.debug('lod.rignum = %d' % (self.rignum))
+            logging.debug('lod.rignum = %d', self.rignum)
             if self.rignum > 0:
                 self.rigs = [_bf2rig() for i in range(self.rignum)]
                 for rig in self.rigs:
                     rig.load(fo)
         else:
             self.nodenum = read_long(fo)
-            logging.debug('lod.nodenum = %d' % (self.nodenum))
+            logging.debug('lod.nodenum = %d', self.nodenum)
             if not isBundledMesh:
                 for _ in range(self.nodenum):
                     self.nodes.append(read_matrix4(fo))
@@ -857,13 +1554,29 @@ class _bf2lod:
             if not isBundledMesh:
                 for node in self.nodes:
                     write_matrix4(fo, node)
+
+    def nodes_size(self, version, isBundledMesh, isSkinnedMesh):
+        size = FLOAT3.size * 2
+
+        if version <= 6:
+            size += FLOAT3.size
+
+        if isSkinnedMesh:
+            size += LONG.size
+            for rig in self.rigs:
+                size += rig.size()
+        else:
+            size += LONG.size
+            if not isBundledMesh:
+                size += MATRIX4.size * len(self.nodes)
+        return size
     
     def load_materials(self, fo, version, isSkinnedMesh):
         self.matnum = read_long(fo)
-        logging.debug('lod.matnum = %d' % (self.matnum))
+        logging.debug('lod.matnum = %d', self.matnum)
         self.materials = [_bf2mat() for i in range(self.matnum)]
         for material_id, material in enumerate(self.materials):
-            logging.debug('reading material%d at %d' % (material_id, fo.tell()))
+            logging.debug('reading material%d at %d', material_id, fo.tell())
             material.load(fo, version, isSkinnedMesh)
     
     def export_materials(self, fo, version, isSkinnedMesh):
@@ -871,6 +1584,9 @@ class _bf2lod:
         for material in self.materials:
             material.export(fo, version, isSkinnedMesh)
 
+    def materials_size(self, version, isSkinnedMesh):
+        return LONG.size + sum([material.size(version, isSkinnedMesh) for material in self.materials])
+
 class _bf2rig:
     def __init__(self):
         self.bonenum = 0
@@ -878,12 +1594,12 @@ class _bf2rig:
 
     def __eq__(self, other):
         if self.bonenum != other.bonenum:
-            logging.debug('\nrig.bonenum = %d\nother.bonenum = %d' % (self.bonenum, other.bonenum))
+            logging.debug('\nrig.bonenum = %d\nother.bonenum = %d', self.bonenum, other.bonenum)
             return False
         for boneId, bone in enumerate(self.bones):
             other_bone = other.bones[boneId]
             if bone != other_bone:
-                logging.debug('\nrig.bones[%d] = %s\nrig.bones[%d] = %s' % (boneId, str(bone), boneId, str(other_bone)))
+                logging.debug('\nrig.bones[%d] = %s\nrig.bones[%d] = %s', boneId, str(bone), boneId, str(other_bone))
                 return False
         return True
 
@@ -901,6 +1617,9 @@ class _bf2rig:
             write_long(fo, bone.id)
             write_matrix4(fo, bone.matrix)
 
+    def size(self):
+        return LONG.size + (LONG.size + MATRIX4.size) * len(self.bones)
+
 class _bf2bone:
 
     def __init__(self):
@@ -909,10 +1628,10 @@ class _bf2bone:
     
     def __eq__(self, other):
         if self.id != other.id:
-            logging.debug('\nbone.id = %d\nother.id = %d' % (self.id, other.id))
+            logging.debug('\nbone.id = %d\nother.id = %d', self.id, other.id)
             return False
         if self.matrix != other.matrix:
-            logging.debug('\nbone.matrix = %s\nother.id = %s' % (str(self.matrix), str(other.matrix)))
+            logging.debug('\nbone.matrix = %s\nother.id = %s', str(self.matrix), str(other.matrix))
             return False
         return True
 
@@ -929,16 +1648,10 @@ class _bf2vertattrib:
         self.usage = usage # DX SDK 'Include/d3d9types.h' enum _D3DDECLUSAGE
     
     def load(self, fo):
-        self.flag = read_short(fo)
-        self.offset = read_short(fo)
-        self.vartype = read_short(fo)
-        self.usage = read_short(fo)
+        self.flag, self.offset, self.vartype, self.usage = read_struct(fo, VERTATTRIB)
     
     def export(self, fo):
-        write_short(fo, self.flag)
-        write_short(fo, self.offset)
-        write_short(fo, self.vartype)
-        write_short(fo, self.usage)
+        write_struct(fo, VERTATTRIB, self.flag, self.offset, self.vartype, self.usage)
     
     def __eq__(self, other):
         if not isinstance(other, _bf2vertattrib): return False
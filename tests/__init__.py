@@ -0,0 +1,17 @@
+import contextlib
+
+from bf2mesh import trace
+
+@contextlib.contextmanager
+def tracing():
+    """
+    Collects trace counters within block, leaves tracing disabled and empty after
+
+    """
+    trace.reset()
+    trace.enable()
+    try:
+        yield trace.counters
+    finally:
+        trace.disable()
+        trace.reset()
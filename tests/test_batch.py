@@ -0,0 +1,59 @@
+import unittest
+import unittest.mock
+import os
+
+from bf2mesh.visiblemesh import VisibleMesh
+import bf2mesh.batch
+from bf2mesh.batch import load_many
+from tests import tracing
+
+class test_batch_load_many(unittest.TestCase):
+
+    def setUp(self):
+        self.paths_mesh = [
+            'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh',
+            'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh',
+            'tests/samples/staticmesh/evil_box_dest/Meshes/evil_box_dest.staticmesh',
+            ]
+
+    def test_can_load_many_in_pool(self):
+        vmeshes = load_many(self.paths_mesh, workers=2)
+        self.assertEqual(len(vmeshes), len(self.paths_mesh))
+        for path_mesh, vmesh_loaded in zip(self.paths_mesh, vmeshes):
+            vmesh = VisibleMesh(path_mesh)
+            self.assertEqual(vmesh_loaded.filename, path_mesh)
+            self.assertEqual(vmesh_loaded.vertices, vmesh.vertices)
+            self.assertEqual(vmesh_loaded.index, vmesh.index)
+            self.assertEqual(vmesh_loaded.to_bytes(update_bounds=False), vmesh.to_bytes(update_bounds=False))
+
+    def test_can_load_many_without_shared_memory(self):
+        # platforms freeing blocks on last close pickle arrays instead
+        with unittest.mock.patch.object(bf2mesh.batch, 'SHARED_MEMORY', False):
+            vmeshes = load_many(self.paths_mesh, workers=2)
+        for path_mesh, vmesh_loaded in zip(self.paths_mesh, vmeshes):
+            vmesh = VisibleMesh(path_mesh)
+            self.assertEqual(vmesh_loaded.vertices, vmesh.vertices)
+            self.assertEqual(vmesh_loaded.index, vmesh.index)
+
+    def test_can_load_many_serial(self):
+        vmeshes = load_many(self.paths_mesh, workers=1)
+        self.assertEqual([vmesh.filename for vmesh in vmeshes], self.paths_mesh)
+
+    def test_can_load_many_without_rescan(self):
+        vmeshes = load_many(self.paths_mesh, workers=2)
+        with tracing() as counters:
+            for vmesh in vmeshes:
+                vmesh.update_boundaries()
+            self.assertEqual(counters['vertices_touched'], 0)
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), 'shared memory blocks not listed')
+    def test_can_release_shared_memory_on_failure(self):
+        path_broken = 'tests/generated/batch/broken.staticmesh'
+        os.makedirs(os.path.dirname(path_broken), exist_ok=True)
+        with open(self.paths_mesh[0], 'rb') as meshfile, open(path_broken, 'wb') as brokenfile:
+            brokenfile.write(meshfile.read()[:100])
+
+        blocks = set(os.listdir('/dev/shm'))
+        with self.assertRaises(Exception):
+            load_many([path_broken] + self.paths_mesh * 2, workers=2)
+        self.assertEqual(set(os.listdir('/dev/shm')) - blocks, set())
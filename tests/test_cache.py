@@ -0,0 +1,115 @@
+import unittest
+import os
+import shutil
+
+from bf2mesh.codec import LONG
+from bf2mesh.visiblemesh import VisibleMesh
+from bf2mesh.cache import DiskCache, MeshCache
+
+class test_cache_disk(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+        self.path_cache = 'tests/generated/cache/disk'
+        self.cache = DiskCache(self.path_cache)
+        self.cache.clear()
+
+    def test_can_load_cached_mesh(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        self.cache.load(self.path_mesh)
+        self.assertEqual(len(os.listdir(self.path_cache)), 1)
+
+        vmesh_cached = self.cache.load(self.path_mesh, verify=True)
+        self.assertTrue(vmesh_cached.isLoaded)
+        self.assertEqual(vmesh_cached.filename, self.path_mesh)
+        self.assertEqual(vmesh_cached.vertices, vmesh.vertices)
+        self.assertEqual(vmesh_cached.index, vmesh.index)
+        self.assertEqual(vmesh_cached.to_bytes(update_bounds=False), vmesh.to_bytes(update_bounds=False))
+        self.assertEqual(vmesh_cached.head, vmesh.head)
+        self.assertEqual(vmesh_cached.vertex_attributes, vmesh.vertex_attributes)
+        for geom_cached, geom in zip(vmesh_cached.geoms, vmesh.geoms):
+            self.assertEqual(geom_cached.lods, geom.lods)
+
+    def test_can_reparse_broken_entry(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        self.cache.load(self.path_mesh)
+        entry = os.path.join(self.path_cache, os.listdir(self.path_cache)[0])
+        size = os.stat(entry).st_size
+        with open(entry, 'r+b') as entryfile:
+            entryfile.truncate(size // 2)
+
+        vmesh_cached = self.cache.load(self.path_mesh)
+        self.assertEqual(vmesh_cached.vertices, vmesh.vertices)
+        self.assertEqual(os.stat(entry).st_size, size)
+        self.assertEqual(self.cache.load(self.path_mesh).vertices, vmesh.vertices)
+
+    def test_can_reparse_entry_of_other_version(self):
+        self.cache.load(self.path_mesh)
+        entry = os.path.join(self.path_cache, os.listdir(self.path_cache)[0])
+        with open(entry, 'rb') as entryfile:
+            data = entryfile.read()
+        magic_old = b'BF2MESHCACHE' + LONG.pack(DiskCache.VERSION - 1)
+        with open(entry, 'wb') as entryfile:
+            entryfile.write(magic_old + data[len(DiskCache.MAGIC):])
+
+        self.assertTrue(self.cache.load(self.path_mesh).isLoaded)
+        with open(entry, 'rb') as entryfile:
+            self.assertTrue(entryfile.read().startswith(DiskCache.MAGIC))
+
+    def test_can_evict_over_budget(self):
+        self.cache.load(self.path_mesh)
+        self.cache.load('tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh')
+        self.assertEqual(len(os.listdir(self.path_cache)), 2)
+
+        entries = sorted(os.listdir(self.path_cache), key=lambda name: os.stat(os.path.join(self.path_cache, name)).st_mtime_ns)
+        self.cache.evict(os.stat(os.path.join(self.path_cache, entries[-1])).st_size)
+        self.assertEqual(os.listdir(self.path_cache), entries[-1:])
+
+class test_cache_memory(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/generated/cache/memory/evil_box.staticmesh'
+        os.makedirs(os.path.dirname(self.path_mesh), exist_ok=True)
+        shutil.copy('tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh', self.path_mesh)
+        self.cache = MeshCache()
+
+    def test_can_share_arrays_until_edit(self):
+        vmesh = self.cache.open(self.path_mesh)
+        vmesh2 = self.cache.open(self.path_mesh)
+        self.assertEqual(len(self.cache), 1)
+        self.assertIsNot(vmesh, vmesh2)
+        self.assertIsNot(vmesh.geoms, vmesh2.geoms)
+        self.assertIs(vmesh.vertices.array, vmesh2.vertices.array)
+
+        vmesh.translate((0.0, 0.0, 1.5))
+        self.assertEqual(vmesh.vertices[2], vmesh2.vertices[2] + 1.5)
+        self.assertEqual(self.cache.open(self.path_mesh).vertices, vmesh2.vertices)
+
+        # vertex-only edits keep index shared
+        vmesh2.renormalize()
+        self.assertIs(vmesh2.index.array, vmesh.index.array)
+
+    def test_can_write_through_shared_views(self):
+        vmesh = self.cache.open(self.path_mesh)
+        vmesh2 = self.cache.open(self.path_mesh)
+        vmesh.attribute('POSITION')[0] = (1.0, 2.0, 3.0)
+        vmesh.vertex_array.NORMAL[0] = (0.0, 0.0, 1.0)
+        vmesh.material_indices[(0, 0, 0)][0:3] = (0, 1, 2)
+        self.assertEqual(vmesh.vertices[0:6], (1.0, 2.0, 3.0, 0.0, 0.0, 1.0))
+        self.assertEqual(vmesh.index[0:3], (0, 1, 2))
+        self.assertNotEqual(vmesh2.vertices[0:6], vmesh.vertices[0:6])
+        self.assertNotEqual(vmesh2.index[0:3], vmesh.index[0:3])
+
+    def test_can_invalidate_on_mtime_change(self):
+        vmesh = self.cache.open(self.path_mesh)
+        vmesh.translate((0.0, 0.0, 1.5))
+        vmesh.export(self.path_mesh, update_bounds=False)
+        stat = os.stat(self.path_mesh)
+        os.utime(self.path_mesh, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.cache.open(self.path_mesh).vertices, vmesh.vertices)
+
+    def test_can_evict_over_budget(self):
+        self.cache.max_bytes = 0
+        self.cache.open(self.path_mesh)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.nbytes, 0)
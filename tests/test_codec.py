@@ -0,0 +1,36 @@
+import unittest
+import struct
+import io
+
+import numpy as np
+
+from bf2mesh import codec
+from bf2mesh.io import Buffer, read_structs, write_structs, read_array
+
+class test_codec_records(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [(0, 0, 2, 0), (0, 12, 2, 3), (0, 24, 4, 2)]
+
+    def test_can_pack_and_unpack_records(self):
+        data = bytearray(4 + codec.VERTATTRIB.size * len(self.records))
+        offset = codec.pack_into(codec.VERTATTRIB, data, 4, *self.records)
+        self.assertEqual(offset, len(data))
+        self.assertEqual(codec.unpack_from(codec.VERTATTRIB, data, 4, len(self.records)), self.records)
+        self.assertEqual(codec.unpack_from(codec.VERTATTRIB, data, 4), self.records[:1])
+        self.assertEqual(codec.unpack_from(codec.VERTATTRIB, data, 4, 0), [])
+
+    def test_can_read_and_write_records(self):
+        fo = Buffer(bytearray(codec.VERTATTRIB.size * len(self.records)))
+        write_structs(fo, codec.VERTATTRIB, self.records)
+        self.assertEqual(fo.tell(), len(fo))
+        fo.seek(0)
+        self.assertEqual(read_structs(fo, codec.VERTATTRIB, len(self.records)), self.records)
+        self.assertEqual(fo.tell(), len(fo))
+
+    def test_can_read_array_from_stream(self):
+        values = np.arange(6, dtype='<f4')
+        fo = io.BytesIO(values.tobytes())
+        self.assertTrue((read_array(fo, '<f4', 6) == values).all())
+        fo.seek(4)
+        self.assertRaises(struct.error, read_array, fo, '<f4', 6)
@@ -0,0 +1,38 @@
+import unittest
+import io
+import json
+
+from bf2mesh import trace
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_trace(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        trace.reset()
+
+    def tearDown(self):
+        trace.disable()
+        trace.reset()
+
+    def test_not_collecting_when_disabled(self):
+        trace.disable()
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh.translate((0.0, 0.0, 1.5))
+        self.assertEqual(trace.stats(), {'timers': {}, 'calls': {}, 'counters': {}})
+
+    def test_can_collect_phases_and_counters(self):
+        trace.enable()
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh.translate((0.0, 0.0, 1.5))
+        vmesh.merge(VisibleMesh(self.path_mesh))
+        data = vmesh.to_bytes()
+
+        stats = json.loads(trace.dump(io.StringIO()))
+        self.assertEqual(stats['calls']['load'], 2)
+        self.assertEqual(stats['calls']['translate'], 1)
+        self.assertEqual(stats['calls']['export'], 1)
+        self.assertEqual(stats['counters']['bytes_read'], 2 * 2486)
+        self.assertEqual(stats['counters']['bytes_written'], len(data))
+        self.assertEqual(stats['counters']['indices_rebased'], 36)
+        self.assertEqual(stats['counters']['vertices_touched'], 25 + 50)
@@ -2,10 +2,14 @@ import unittest
 import struct
 import os
 
+import numpy as np
+
 from bf2mesh.bf2types import USED, UNUSED
 from bf2mesh.bf2types import D3DDECLTYPE, D3DDECLUSAGE
 import bf2mesh.visiblemesh
+from bf2mesh import trace
 from bf2mesh.visiblemesh import VisibleMesh
+from tests import tracing
 
 class test_visiblemesh_edit_skinnedmesh_kits(unittest.TestCase):
 
@@ -133,6 +137,279 @@ class test_visiblemesh_edit_staticmesh(unittest.TestCase):
                                     #print('[%d]old %s to %s' % (vertId, D3DDECLUSAGE(attrib.usage).name, vertex_OldBuffer[_start:_end]))
                                 self.assertEqual(tuple(a-b for a, b in zip(getattr(vertex, D3DDECLUSAGE.POSITION.name), offset)), getattr(vertex_old, D3DDECLUSAGE.POSITION.name))
 
+    def test_can_translate_vertices_range(self):
+        offset = (1.0, 2.0, 3.0)
+        with VisibleMesh(self.meshes['lods'][0]) as vmesh:
+            position_old = vmesh.attribute(D3DDECLUSAGE.POSITION).copy()
+            vmesh.translate(offset, 2, 5)
+            position = vmesh.attribute(D3DDECLUSAGE.POSITION)
+            self.assertTrue((position[2:5] == position_old[2:5] + offset).all())
+            self.assertTrue((position[:2] == position_old[:2]).all())
+            self.assertTrue((position[5:] == position_old[5:]).all())
+
+    def test_can_translate_selected_geoms(self):
+        offset = (0.0, 0.0, 1.5)
+        with VisibleMesh(self.meshes['dest'][0]) as vmesh:
+            position_old = vmesh.attribute(D3DDECLUSAGE.POSITION).copy()
+            vmesh.translate(offset, geoms=[1])
+            position = vmesh.attribute(D3DDECLUSAGE.POSITION)
+            for geomId, geom in enumerate(vmesh.geoms):
+                for lod in geom.lods:
+                    for material in lod.materials:
+                        vertices = slice(material.vstart, material.vstart + material.vnum)
+                        expected = position_old[vertices] + (offset if geomId == 1 else 0.0)
+                        self.assertTrue((position[vertices] == expected).all())
+            self.assertRaises(AttributeError, vmesh.translate, offset, 0, 5, geoms=[1])
+
+    def test_can_rotate_selected_lods(self):
+        with VisibleMesh(self.meshes['lods'][0]) as vmesh, VisibleMesh(self.meshes['lods'][0]) as vmesh_rotated:
+            vmesh.rotate((45.0, 0.0, 0.0), geoms=[0], lods=[1], materials=[0])
+            vmesh_rotated.rotate((45.0, 0.0, 0.0))
+            for lodId, lod in enumerate(vmesh.geoms[0].lods):
+                for material in lod.materials:
+                    vertices = slice(material.vstart, material.vstart + material.vnum)
+                    expected = (vmesh_rotated if lodId == 1 else VisibleMesh(self.meshes['lods'][0])).attribute(D3DDECLUSAGE.NORMAL)[vertices]
+                    self.assertTrue((vmesh.attribute(D3DDECLUSAGE.NORMAL)[vertices] == expected).all())
+
+    def test_can_transform_staticmesh(self):
+        # translation in last row, same as translate()
+        matrix = [
+            [1.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+            [0.0, 0.0, 1.5, 1.0]]
+        with VisibleMesh(self.meshes['simple'][0]) as vmesh, VisibleMesh(self.meshes['simple'][0]) as vmesh_translated:
+            vmesh.transform(matrix)
+            vmesh_translated.translate((0.0, 0.0, 1.5))
+            self.assertEqual(vmesh.vertices, vmesh_translated.vertices)
+
+    def test_can_transform_normals_with_scale(self):
+        matrix = [
+            [2.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+            [0.0, 0.0, 0.0, 1.0]]
+        with VisibleMesh(self.meshes['simple'][0]) as vmesh:
+            position_old = vmesh.attribute(D3DDECLUSAGE.POSITION).copy()
+            normal_old = vmesh.attribute(D3DDECLUSAGE.NORMAL).copy()
+            vmesh.transform(matrix)
+            self.assertTrue((vmesh.attribute(D3DDECLUSAGE.POSITION)[:, 0] == position_old[:, 0] * 2).all())
+            self.assertTrue((vmesh.attribute(D3DDECLUSAGE.NORMAL)[:, 0] == normal_old[:, 0] / 2).all())
+            # tangents stay perpendicular to normals
+            dot = (vmesh.attribute(D3DDECLUSAGE.NORMAL) * vmesh.attribute(D3DDECLUSAGE.TANGENT)).sum(axis=1)
+            self.assertTrue(np.allclose(dot, 0.0, atol=1e-6))
+
+    def test_can_update_boundaries(self):
+        with VisibleMesh(self.meshes['dest'][0]) as vmesh:
+            bounds_old = [(lod.min, lod.max) for geom in vmesh.geoms for lod in geom.lods]
+            material_bounds_old = [material.mmax for geom in vmesh.geoms for lod in geom.lods for material in lod.materials]
+            vmesh.translate((0.0, 0.0, 1.5), geoms=[1])
+            vmesh.update_boundaries()
+            for geomId, geom in enumerate(vmesh.geoms):
+                for lod in geom.lods:
+                    lod_min, lod_max = bounds_old.pop(0)
+                    # bounds only grow
+                    self.assertEqual(lod.min, lod_min)
+                    if geomId == 1:
+                        self.assertEqual(lod.max, lod_max[:2] + (lod_max[2] + 1.5,))
+                    else:
+                        self.assertEqual(lod.max, lod_max)
+                    for material in lod.materials:
+                        position = vmesh.attribute(D3DDECLUSAGE.POSITION)[material.vstart:material.vstart + material.vnum]
+                        self.assertEqual(material.mmax[2], max(material_bounds_old.pop(0)[2], position[:, 2].max()))
+
+    def test_can_update_only_edited_boundaries(self):
+        with VisibleMesh(self.meshes['dest'][0]) as vmesh:
+            geom_vnum = [sum([material.vnum for lod in geom.lods for material in lod.materials]) for geom in vmesh.geoms]
+            with tracing() as counters:
+                vmesh.update_boundaries()
+                self.assertEqual(counters['vertices_touched'], 0)
+
+                # translated bounds moved along, nothing to rescan
+                vmesh.translate((0.0, 0.0, 1.5), geoms=[1])
+                trace.reset()
+                vmesh.update_boundaries()
+                self.assertEqual(counters['vertices_touched'], 0)
+
+                vmesh.transform(np.identity(4) * (1.0, 1.0, 2.0, 1.0), geoms=[1])
+                trace.reset()
+                vmesh.update_boundaries()
+                self.assertEqual(counters['vertices_touched'], geom_vnum[1])
+
+                # positions view could be written, all rescanned
+                vmesh.attribute(D3DDECLUSAGE.POSITION)
+                trace.reset()
+                vmesh.update_boundaries()
+                self.assertEqual(counters['vertices_touched'], sum(geom_vnum))
+
+                trace.reset()
+                vmesh.update_boundaries(full=True)
+                self.assertEqual(counters['vertices_touched'], sum(geom_vnum))
+
+    def test_can_mirror_staticmesh(self):
+        def facing(vmesh):
+            # sign of face normal along vertex normal, per triangle
+            position = vmesh.attribute(D3DDECLUSAGE.POSITION)
+            normal = vmesh.attribute(D3DDECLUSAGE.NORMAL)
+            triangles = vmesh.index.array.reshape(-1, 3)
+            face = np.cross(position[triangles[:, 1]] - position[triangles[:, 0]], position[triangles[:, 2]] - position[triangles[:, 0]])
+            return np.sign((face * normal[triangles[:, 0]]).sum(axis=1))
+
+        for staticmesh in self.meshes:
+            with VisibleMesh(self.meshes[staticmesh][0]) as vmesh, VisibleMesh(self.meshes[staticmesh][0]) as vmesh_mirrored:
+                vmesh_mirrored.scale((-1.0, 1.0, 1.0))
+                self.assertTrue((facing(vmesh_mirrored) == facing(vmesh)).all())
+                self.assertTrue((vmesh_mirrored.attribute(D3DDECLUSAGE.POSITION)[:, 0] == -vmesh.attribute(D3DDECLUSAGE.POSITION)[:, 0]).all())
+                # binormal = normal x tangent stays mirrored one
+                binormal = np.cross(vmesh.attribute(D3DDECLUSAGE.NORMAL), vmesh.attribute(D3DDECLUSAGE.TANGENT)) * (-1.0, 1.0, 1.0)
+                binormal_mirrored = np.cross(vmesh_mirrored.attribute(D3DDECLUSAGE.NORMAL), vmesh_mirrored.attribute(D3DDECLUSAGE.TANGENT))
+                self.assertTrue(np.allclose(binormal_mirrored, binormal))
+
+                vmesh_mirrored.scale((-1.0, 1.0, 1.0))
+                self.assertEqual(vmesh_mirrored.vertices, vmesh.vertices)
+                self.assertEqual(vmesh_mirrored.index, vmesh.index)
+
+    def test_can_mirror_stored_binormals(self):
+        with VisibleMesh(self.meshes['simple'][0]) as vmesh:
+            # pretend mesh stores binormals in place of UV2&UV3
+            for attrib in vmesh.vertex_attributes:
+                if attrib.usage == D3DDECLUSAGE.UV2: attrib.usage, attrib.vartype = D3DDECLUSAGE.BINORMAL, D3DDECLTYPE.FLOAT3
+                if attrib.usage == D3DDECLUSAGE.UV3: attrib.flag = UNUSED
+            vmesh.attribute(D3DDECLUSAGE.BINORMAL)[:] = np.cross(vmesh.attribute(D3DDECLUSAGE.NORMAL), vmesh.attribute(D3DDECLUSAGE.TANGENT))
+            tangent_old = vmesh.attribute(D3DDECLUSAGE.TANGENT).copy()
+            binormal_old = vmesh.attribute(D3DDECLUSAGE.BINORMAL).copy()
+
+            vmesh.scale((-1.0, 1.0, 1.0))
+            # stored frame mirrored as whole, tangent not flipped
+            self.assertTrue((vmesh.attribute(D3DDECLUSAGE.TANGENT) == tangent_old * (-1.0, 1.0, 1.0)).all())
+            self.assertTrue((vmesh.attribute(D3DDECLUSAGE.BINORMAL) == binormal_old * (-1.0, 1.0, 1.0)).all())
+
+    def test_can_renormalize_frames(self):
+        with VisibleMesh(self.meshes['simple'][0]) as vmesh:
+            normal_old = vmesh.attribute(D3DDECLUSAGE.NORMAL).copy()
+            vmesh.renormalize()
+            self.assertTrue(np.allclose(vmesh.attribute(D3DDECLUSAGE.NORMAL), normal_old))
+
+            vmesh.scale((3.0, 1.0, 0.5))
+            vmesh.attribute(D3DDECLUSAGE.TANGENT)[:] += (0.0, 0.25, 0.0)
+            vmesh.renormalize(frames=False)
+            normal = vmesh.attribute(D3DDECLUSAGE.NORMAL)
+            tangent = vmesh.attribute(D3DDECLUSAGE.TANGENT)
+            self.assertTrue(np.allclose(np.linalg.norm(normal, axis=1), 1.0))
+            self.assertTrue(np.allclose(np.linalg.norm(tangent, axis=1), 1.0))
+            self.assertFalse(np.allclose((normal * tangent).sum(axis=1), 0.0, atol=1e-6))
+
+            vmesh.renormalize(frames=True)
+            self.assertTrue(np.allclose(np.linalg.norm(tangent, axis=1), 1.0))
+            self.assertTrue(np.allclose((normal * tangent).sum(axis=1), 0.0, atol=1e-6))
+
+    def test_can_recenter_staticmesh(self):
+        with VisibleMesh(self.meshes['simple'][0]) as vmesh:
+            position_old = vmesh.attribute(D3DDECLUSAGE.POSITION).copy()
+            self.assertEqual(vmesh.recenter('bounds'), (0.0, 0.5, 0.0))
+            self.assertEqual(vmesh.geoms[0].lods[0].min, (-0.5, -0.5, -0.5))
+            self.assertEqual(vmesh.geoms[0].lods[0].max, (0.5, 0.5, 0.5))
+            self.assertEqual(vmesh.geoms[0].lods[0].materials[0].mmin, (-0.5, -0.5, -0.5))
+            self.assertTrue((vmesh.attribute(D3DDECLUSAGE.POSITION) == position_old - (0.0, 0.5, 0.0)).all())
+
+            center = vmesh.recenter('centroid')
+            self.assertTrue(np.allclose(vmesh.attribute(D3DDECLUSAGE.POSITION).mean(axis=0), 0.0, atol=1e-6))
+            self.assertEqual(vmesh.geoms[0].lods[0].max, tuple(0.5 - c for c in center))
+
+            self.assertEqual(vmesh.recenter('pivot', pivot=(1.0, 0.0, 0.0)), (1.0, 0.0, 0.0))
+            self.assertRaises(AttributeError, vmesh.recenter, 'pivot')
+            self.assertRaises(AttributeError, vmesh.recenter, 'origin')
+
+        with VisibleMesh(self.meshes['simple'][0]) as vmesh:
+            vmesh.translate((5.0, 0.0, 0.0))
+            self.assertEqual(vmesh.geoms[0].lods[0].min, (4.5, 0.0, -0.5))
+            self.assertEqual(vmesh.recenter('bounds'), (5.0, 0.5, 0.0))
+            self.assertEqual(vmesh.geoms[0].lods[0].max, (0.5, 0.5, 0.5))
+
+    def test_can_rotate_around_pivot(self):
+        with VisibleMesh(self.meshes['simple'][0]) as vmesh:
+            vmesh.rotate((180.0, 0.0, 0.0), pivot=(0.5, 0.0, 0.5))
+            lod = vmesh.geoms[0].lods[0]
+            self.assertTrue(np.allclose(lod.min, (0.5, 0.0, 0.5), atol=1e-6))
+            self.assertTrue(np.allclose(lod.max, (1.5, 1.0, 1.5), atol=1e-6))
+
+            # bounds moved along, nothing left to rescan
+            with tracing() as counters:
+                vmesh.update_boundaries()
+                self.assertEqual(counters['vertices_touched'], 0)
+            position = vmesh.attribute(D3DDECLUSAGE.POSITION)
+            self.assertTrue((position >= np.float32(lod.min)).all() and (position <= np.float32(lod.max)).all())
+
+    def test_can_rotate_full_turn_keeping_bounds(self):
+        with VisibleMesh(self.meshes['lods'][0]) as vmesh:
+            bounds_old = [(lod.min, lod.max) for lod in vmesh.geoms[0].lods]
+            for _ in range(8):
+                vmesh.rotate((45.0, 0.0, 0.0))
+            for lod, (lod_min, lod_max) in zip(vmesh.geoms[0].lods, bounds_old):
+                self.assertTrue(np.allclose(lod.min, lod_min, atol=1e-5))
+                self.assertTrue(np.allclose(lod.max, lod_max, atol=1e-5))
+                for material in lod.materials:
+                    position = vmesh.attribute(D3DDECLUSAGE.POSITION)[material.vstart:material.vstart + material.vnum]
+                    self.assertEqual(material.mmin, tuple(position.min(axis=0).astype(np.float64).tolist()))
+                    self.assertEqual(material.mmax, tuple(position.max(axis=0).astype(np.float64).tolist()))
+
+    def test_can_transform_node(self):
+        offset = (0.0, 2.0, 0.0)
+        with VisibleMesh(self.meshes['dest'][0]) as vmesh:
+            position_old = vmesh.attribute(D3DDECLUSAGE.POSITION).copy()
+            self.assertEqual(list(vmesh.node_groups), [0])
+            # pretend every lod has second node, first 4 vertices of each material
+            vmesh.attribute(D3DDECLUSAGE.BLENDINDICES)[:, 0] = 0
+            for geom in vmesh.geoms:
+                for lod in geom.lods:
+                    for material in lod.materials:
+                        vmesh.attribute(D3DDECLUSAGE.BLENDINDICES)[material.vstart:material.vstart + 4, 0] = 1
+            node = vmesh.node_groups[1]
+            self.assertEqual(len(node), 4 * len(vmesh.geoms))
+
+            vmesh.transform_node(1, [
+                [1.0, 0.0, 0.0, 0.0],
+                [0.0, 1.0, 0.0, 0.0],
+                [0.0, 0.0, 1.0, 0.0],
+                [*offset, 1.0]], geoms=[0])
+            moved = node[node < vmesh.geoms[1].lods[0].materials[0].vstart]
+            expected = position_old.copy()
+            expected[moved] += offset
+            self.assertTrue((vmesh.attribute(D3DDECLUSAGE.POSITION) == expected).all())
+
+            # mirrored node flips only own triangles
+            index_old = vmesh.index.array.copy()
+            vmesh.transform_node(1, np.diag([-1.0, 1.0, 1.0, 1.0]))
+            node_mask = vmesh.node_ids == 1
+            for geom in vmesh.geoms:
+                for lod in geom.lods:
+                    for material in lod.materials:
+                        indices = slice(material.istart, material.istart + material.inum)
+                        triangles = index_old[indices].reshape(-1, 3)
+                        flipped = (vmesh.index.array[indices].reshape(-1, 3) != triangles).any(axis=1)
+                        expected = node_mask[triangles + material.vstart].all(axis=1)
+                        self.assertTrue(expected.any())
+                        self.assertTrue((flipped == expected).all())
+            self.assertEqual(vmesh.validate(), [])
+
+    def test_can_edit_attribute_view(self):
+        path_mesh = self.meshes['simple'][0]
+        with VisibleMesh(path_mesh) as vmesh:
+            position = vmesh.attribute(D3DDECLUSAGE.POSITION)
+            self.assertEqual(position.shape, (vmesh.vertnum, 3))
+            self.assertIs(vmesh.attribute('POSITION'), position)
+            self.assertIsNone(vmesh.attribute(D3DDECLUSAGE.BINORMAL))
+
+            position[0] = (1.0, 2.0, 3.0)
+            self.assertEqual(vmesh.vertices[0:3], (1.0, 2.0, 3.0))
+            self.assertEqual(tuple(vmesh.vertex_array.POSITION[0]), (1.0, 2.0, 3.0))
+
+    def test_can_edit_material_indices_view(self):
+        path_mesh = self.meshes['simple'][0]
+        with VisibleMesh(path_mesh) as vmesh:
+            vmesh.material_indices[(0, 0, 0)][0:3] = (0, 1, 2)
+            self.assertEqual(vmesh.index[0:3], (0, 1, 2))
+
     # TODO: come up with test for that shit
     def test_can_merge_staticmesh(self):
         #self.skipTest('NotImplemented')
@@ -164,4 +441,100 @@ class test_visiblemesh_edit_staticmesh(unittest.TestCase):
         self.skipTest('DUNNO how check beside visual yet, ported from v1')
 
 
-                        
\ No newline at end of file
+                        
+class test_visiblemesh_edit_staticmesh_deferred(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+        self.path_export = 'tests/generated/staticmesh/edit/deferred/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+        trace.reset()
+
+    def tearDown(self):
+        trace.disable()
+        trace.reset()
+
+    def edit(self, vmesh):
+        vmesh.translate((0.0, 0.0, 1.5))
+        vmesh.rotate((45.0, 0.0, 30.0))
+        vmesh.transform([
+            [2.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+            [1.0, 0.0, 0.0, 1.0]])
+        vmesh.translate((0.0, -1.0, 0.0))
+
+    def test_can_defer_transforms_until_access(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        self.edit(vmesh)
+
+        trace.enable()
+        vmesh_deferred = VisibleMesh(self.path_mesh, deferred=True)
+        self.edit(vmesh_deferred)
+        self.assertEqual(trace.counters['vertices_touched'], 0)
+        self.assertEqual(trace.counters['transforms_deferred'], 4)
+
+        for usage in [D3DDECLUSAGE.POSITION, D3DDECLUSAGE.NORMAL, D3DDECLUSAGE.TANGENT]:
+            self.assertTrue(np.allclose(vmesh_deferred.attribute(usage), vmesh.attribute(usage), atol=1e-5))
+        self.assertEqual(trace.counters['vertices_touched'], vmesh.vertnum)
+
+    def test_can_defer_mirroring_transforms(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh.translate((0.0, 0.0, 1.5))
+        vmesh.scale((-1.0, 1.0, 1.0))
+
+        trace.enable()
+        vmesh_deferred = VisibleMesh(self.path_mesh, deferred=True)
+        vmesh_deferred.translate((0.0, 0.0, 1.5))
+        vmesh_deferred.scale((-1.0, 1.0, 1.0))
+        self.assertEqual(trace.counters['vertices_touched'], 0)
+        self.assertEqual(vmesh_deferred.index, vmesh.index)
+        self.assertTrue(np.allclose(vmesh_deferred.attribute(D3DDECLUSAGE.POSITION), vmesh.attribute(D3DDECLUSAGE.POSITION)))
+        self.assertEqual(trace.counters['vertices_touched'], vmesh.vertnum)
+
+    def test_can_recenter_without_applying_transforms(self):
+        def edit(vmesh):
+            vmesh.recenter('bounds')
+            vmesh.rotate((45.0, 0.0, 0.0))
+            vmesh.translate((0.0, 0.0, 1.5))
+            return vmesh.recenter('bounds')
+        vmesh = VisibleMesh(self.path_mesh)
+        center = edit(vmesh)
+
+        trace.enable()
+        vmesh_deferred = VisibleMesh(self.path_mesh, deferred=True)
+        self.assertTrue(np.allclose(edit(vmesh_deferred), center, atol=1e-5))
+        self.assertEqual(trace.counters['vertices_touched'], 0)
+        vmesh_deferred.export(self.path_export)
+        self.assertEqual(trace.counters['vertices_touched'], vmesh.vertnum)
+        for lod, lod_deferred in zip(vmesh.geoms[0].lods, vmesh_deferred.geoms[0].lods):
+            self.assertTrue(np.allclose(lod_deferred.min, lod.min, atol=1e-5))
+            self.assertTrue(np.allclose(lod_deferred.max, lod.max, atol=1e-5))
+
+    def test_raise_exception_if_singular_transform(self):
+        vmesh = VisibleMesh(self.path_mesh, deferred=True)
+        self.assertRaises(AttributeError, vmesh.scale, (1.0, 0.0, 1.0))
+        self.assertEqual(vmesh.vertices, VisibleMesh(self.path_mesh).vertices)
+
+    def test_can_update_boundaries_of_deferred_transforms(self):
+        matrix = [
+            [1.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+            [5.0, 0.0, 0.0, 1.0]]
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh.transform(matrix)
+        vmesh.update_boundaries()
+        vmesh_deferred = VisibleMesh(self.path_mesh, deferred=True)
+        vmesh_deferred.transform(matrix)
+        vmesh_deferred.update_boundaries()
+        for lod, lod_deferred in zip(vmesh.geoms[0].lods, vmesh_deferred.geoms[0].lods):
+            self.assertEqual(lod_deferred.min, lod.min)
+            self.assertEqual(lod_deferred.max, lod.max)
+
+    def test_can_export_deferred_transforms(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh.translate((0.0, 0.0, 1.5))
+        with VisibleMesh(self.path_mesh, lazy=True, deferred=True) as vmesh_deferred:
+            vmesh_deferred.translate((0.0, 0.0, 1.5))
+            vmesh_deferred.export(self.path_export)
+        self.assertEqual(VisibleMesh(self.path_export).vertices, vmesh.vertices)
@@ -1,11 +1,14 @@
 import unittest
 import struct
 import logging
+import os
+import copy
+import shutil
 
 from bf2mesh.bf2types import USED, UNUSED
 from bf2mesh.bf2types import D3DDECLTYPE, D3DDECLUSAGE
 import bf2mesh.visiblemesh
-from bf2mesh.visiblemesh import VisibleMesh
+from bf2mesh.visiblemesh import VisibleMesh, scan
 
 class test_visiblemesh_read_static(unittest.TestCase):
 
@@ -100,6 +103,13 @@ class test_visiblemesh_read_static(unittest.TestCase):
             # no need to mock whole vertices array in test, reading first few
             self.assertEqual(vmesh.vertices[0:6], mock_test_data[0:6])
 
+    def test_can_read_vertex_array(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            self.assertEqual(vmesh.vertex_dtype.itemsize, vmesh.vertstride)
+            self.assertEqual(vmesh.vertex_array.shape, (vmesh.vertnum,))
+            self.assertEqual(tuple(vmesh.vertex_array.POSITION[0]), (0.5, 0.0, 0.5))
+            self.assertEqual(tuple(vmesh.vertex_array.NORMAL[0]), (0.0, -1.0, 0.0))
+
     def test_can_read_indexnum(self):
         with VisibleMesh(self.path_mesh) as vmesh:
             self.assertEqual(vmesh.indexnum, 36)
@@ -110,6 +120,13 @@ class test_visiblemesh_read_static(unittest.TestCase):
             # no need to mock whole vertices array in test, reading first few
             self.assertEqual(vmesh.index[0:6], mock_test_data[0:6])
 
+    def test_can_read_material_indices(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            material_indices = vmesh.material_indices
+            self.assertEqual(list(material_indices), [(0, 0, 0)])
+            self.assertEqual(material_indices[(0, 0, 0)].dtype.itemsize, 2)
+            self.assertEqual(tuple(material_indices[(0, 0, 0)][0:6]), (22, 23, 20, 20, 21, 22))
+
     def test_can_read_u2(self):
         with VisibleMesh(self.path_mesh) as vmesh:
             self.assertEqual(vmesh.u2, 8) # some weirdo bfp4f stuff
@@ -152,6 +169,141 @@ class test_visiblemesh_read_static(unittest.TestCase):
             self.assertTrue(vmesh.isStaticMesh)
             self.assertTrue(vmesh.isLoaded)
 
+    def test_can_load_staticmesh_from_bytes(self):
+        with open(self.path_mesh, 'rb') as meshfile:
+            vmesh = VisibleMesh('evil_box.staticmesh', data=meshfile.read())
+        self.assertTrue(vmesh.isStaticMesh)
+        self.assertEqual(vmesh.vertices, VisibleMesh(self.path_mesh).vertices)
+
+    def test_raise_exception_if_not_parsed_all_bytes(self):
+        path_broken = 'tests/generated/staticmesh/read/evil_box_trailing/meshes/evil_box_trailing.staticmesh'
+        os.makedirs(os.path.dirname(path_broken), exist_ok=True)
+        with open(self.path_mesh, 'rb') as meshfile, open(path_broken, 'wb') as brokenfile:
+            brokenfile.write(meshfile.read() + b'\x00')
+        self.assertRaises(AttributeError, VisibleMesh, path_broken)
+
+    def test_can_validate_staticmesh(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            self.assertEqual(vmesh.validate(), [])
+
+    def test_validate_finds_broken_mesh(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            material = vmesh.geoms[0].lods[0].materials[0]
+            material.vnum -= 1
+            problems = vmesh.validate()
+            self.assertEqual(len(problems), 1)
+            self.assertIn('out of its vnum', problems[0])
+
+            material.vnum += 2
+            material.istart += 1
+            self.assertEqual(len(vmesh.validate()), 2)
+
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vmesh.attribute(D3DDECLUSAGE.POSITION)[1] = float('nan')
+            self.assertIn('NaN or Inf', vmesh.validate()[0])
+
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vmesh.vertices = vmesh.vertices.array[:-1]
+            problems = vmesh.validate()
+            self.assertIn('does not match vertnum', problems[0])
+
+    def test_validate_finds_all_overlapping_ranges(self):
+        with VisibleMesh('tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh') as vmesh:
+            lod = vmesh.geoms[0].lods[0]
+            lod.materials.append(copy.copy(lod.materials[0]))
+            lod.materials[0].vnum = vmesh.vertnum
+            lod.materials[1].vstart, lod.materials[1].vnum = 10, 5
+            problems = [problem for problem in vmesh.validate() if 'vertices overlap' in problem]
+            self.assertEqual(problems, [
+                'geoms[0].lods[0].materials[0] vertices overlap geoms[0].lods[0].materials[1]',
+                'geoms[0].lods[0].materials[0] vertices overlap geoms[0].lods[1].materials[0]',
+                ])
+
+class test_visiblemesh_read_static_lazy(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+
+    def test_can_read_tables_without_decoding_blocks(self):
+        with VisibleMesh(self.path_mesh, lazy=True) as vmesh:
+            self.assertTrue(vmesh.isLoaded)
+            self.assertEqual(len(vmesh.geoms[0].lods), 2)
+            self.assertEqual(vmesh.vertex_block.nbytes, vmesh.vertnum * vmesh.vertstride)
+            self.assertEqual(vmesh.index_block.nbytes, vmesh.indexnum * 2)
+
+    def test_can_decode_blocks_on_access(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        with VisibleMesh(self.path_mesh, lazy=True) as vmesh_lazy:
+            self.assertEqual(vmesh_lazy.vertices, vmesh.vertices)
+            self.assertEqual(vmesh_lazy.index, vmesh.index)
+            self.assertIsNone(vmesh_lazy.vertex_block)
+            self.assertIsNone(vmesh_lazy.index_block)
+
+    def test_raise_exception_if_mapped_file_rewritten(self):
+        path_changed = 'tests/generated/staticmesh/read/evil_box_lods_rewritten/meshes/evil_box_lods.staticmesh'
+        os.makedirs(os.path.dirname(path_changed), exist_ok=True)
+        shutil.copy(self.path_mesh, path_changed)
+        vmesh_lazy = VisibleMesh(path_changed, lazy=True)
+        vmesh = VisibleMesh(path_changed)
+        vmesh.translate((0.0, 0.0, 1.5))
+        vmesh.export(path_changed, update_bounds=False)
+        stat = os.stat(path_changed)
+        os.utime(path_changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertRaises(AttributeError, lambda: vmesh_lazy.vertices)
+        self.assertRaises(AttributeError, vmesh_lazy.to_bytes, update_bounds=False)
+
+    def test_can_decode_blocks_of_replaced_file(self):
+        # file replaced by new one, mapping keeps old data
+        path_changed = 'tests/generated/staticmesh/read/evil_box_lods_replaced/meshes/evil_box_lods.staticmesh'
+        os.makedirs(os.path.dirname(path_changed), exist_ok=True)
+        shutil.copy(self.path_mesh, path_changed)
+        vmesh_lazy = VisibleMesh(path_changed, lazy=True)
+        shutil.copy(self.path_mesh, path_changed + '.tmp')
+        os.replace(path_changed + '.tmp', path_changed)
+        self.assertEqual(vmesh_lazy.vertices, VisibleMesh(self.path_mesh).vertices)
+
+class test_visiblemesh_read_static_scan(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_dest/Meshes/evil_box_dest.staticmesh'
+
+    def test_can_scan_tables(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh_scan = scan(self.path_mesh)
+        self.assertTrue(vmesh_scan.isLoaded)
+        self.assertEqual(vmesh_scan.head, vmesh.head)
+        self.assertEqual(vmesh_scan.vertex_attributes, vmesh.vertex_attributes)
+        self.assertEqual(vmesh_scan.vertnum, vmesh.vertnum)
+        self.assertEqual(vmesh_scan.indexnum, vmesh.indexnum)
+        for geomId, geom in enumerate(vmesh_scan.geoms):
+            for lodId, lod in enumerate(geom.lods):
+                self.assertEqual(lod, vmesh.geoms[geomId].lods[lodId])
+
+    def test_can_read_blocks_on_access(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh_scan = scan(self.path_mesh)
+        self.assertEqual(vmesh_scan.vertices, vmesh.vertices)
+        self.assertEqual(vmesh_scan.index, vmesh.index)
+
+    def test_can_read_blocks_after_chdir(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        vmesh_scan = scan(self.path_mesh)
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(self.path_mesh))
+        try:
+            self.assertEqual(vmesh_scan.vertices, vmesh.vertices)
+        finally:
+            os.chdir(cwd)
+
+    def test_raise_exception_if_file_changed(self):
+        path_changed = 'tests/generated/staticmesh/read/evil_box_changed/meshes/evil_box_changed.staticmesh'
+        os.makedirs(os.path.dirname(path_changed), exist_ok=True)
+        shutil.copy(self.path_mesh, path_changed)
+        vmesh_scan = scan(path_changed)
+        stat = os.stat(path_changed)
+        os.utime(path_changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertRaises(AttributeError, lambda: vmesh_scan.vertices)
+
 class test_visiblemesh_read_static_destroyable(unittest.TestCase):
     '''
     Destroyable static meshes have geom1 for destroyed state
@@ -1,11 +1,13 @@
 import unittest
 import struct
 import os
+import io
+import asyncio
 
 from bf2mesh.bf2types import USED, UNUSED
 from bf2mesh.bf2types import D3DDECLTYPE, D3DDECLUSAGE
 import bf2mesh.visiblemesh
-from bf2mesh.visiblemesh import VisibleMesh
+from bf2mesh.visiblemesh import VisibleMesh, aload, scan
 
 class test_visiblemesh_write_staticmesh(unittest.TestCase):
 
@@ -51,6 +53,82 @@ class test_visiblemesh_write_staticmesh(unittest.TestCase):
                 other_lod = self.vmesh.geoms[geomId].lods[lodId]
                 self.assertEqual(lod, other_lod)
 
+    def test_can_write_identical_bytes(self):
+        with open(self.path_mesh, 'rb') as meshfile, open(self.path_save, 'rb') as savefile:
+            self.assertEqual(savefile.read(), meshfile.read())
+
+class test_visiblemesh_write_staticmesh_stream(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_dest/Meshes/evil_box_dest.staticmesh'
+        with open(self.path_mesh, 'rb') as meshfile:
+            self.data = meshfile.read()
+
+    def test_can_calculate_export_size(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        self.assertEqual(vmesh.export_size(), len(self.data))
+
+    def test_can_write_to_bytes(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        data = vmesh.to_bytes(update_bounds=False)
+        self.assertIs(type(data), bytes)
+        self.assertEqual(data, self.data)
+
+    def test_can_write_to_stream(self):
+        vmesh = VisibleMesh(self.path_mesh)
+        stream = io.BytesIO()
+        vmesh.export(stream, update_bounds=False)
+        self.assertEqual(stream.getvalue(), self.data)
+        self.assertEqual(vmesh.filename, self.path_mesh)
+
+    def test_can_write_scanned_to_bytes(self):
+        self.assertEqual(scan(self.path_mesh).to_bytes(update_bounds=False), self.data)
+        self.assertEqual(scan(self.path_mesh).to_bytes(), self.data)
+
+class test_visiblemesh_write_staticmesh_async(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_dest/Meshes/evil_box_dest.staticmesh'
+        self.path_save = 'tests/generated/staticmesh/write/evil_box_dest_async/meshes/evil_box_dest.staticmesh'
+
+    def test_can_load_and_export_async(self):
+        async def roundtrip():
+            vmesh = await aload(self.path_mesh)
+            await vmesh.aexport(self.path_save, update_bounds=False)
+            return vmesh
+        vmesh = asyncio.run(roundtrip())
+        self.assertTrue(vmesh.isLoaded)
+        self.assertEqual(vmesh.filename, self.path_save)
+        with open(self.path_mesh, 'rb') as meshfile, open(self.path_save, 'rb') as savefile:
+            self.assertEqual(savefile.read(), meshfile.read())
+
+class test_visiblemesh_write_staticmesh_lazy(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+        self.path_save = 'tests/generated/staticmesh/write/evil_box_lods_lazy/meshes/evil_box_lods.staticmesh'
+
+    def test_can_write_blocks_without_decoding(self):
+        with VisibleMesh(self.path_mesh, lazy=True) as vmesh:
+            vmesh.export(self.path_save, update_bounds=False)
+            self.assertIsNotNone(vmesh.vertex_block)
+            self.assertIsNotNone(vmesh.index_block)
+        with open(self.path_mesh, 'rb') as meshfile, open(self.path_save, 'rb') as savefile:
+            self.assertEqual(savefile.read(), meshfile.read())
+
+    def test_can_write_bytes_without_decoding(self):
+        with VisibleMesh(self.path_mesh, lazy=True) as vmesh:
+            vmesh.to_bytes()
+            self.assertIsNotNone(vmesh.vertex_block)
+            self.assertIsNotNone(vmesh.index_block)
+
+    def test_can_write_decoded_blocks(self):
+        with VisibleMesh(self.path_mesh, lazy=True) as vmesh:
+            vmesh.vertices, vmesh.index
+            vmesh.export(self.path_save, update_bounds=False)
+        with open(self.path_mesh, 'rb') as meshfile, open(self.path_save, 'rb') as savefile:
+            self.assertEqual(savefile.read(), meshfile.read())
+
 class test_visiblemesh_write_skinnedmesh_kits(unittest.TestCase):
 
     def setUp(self):